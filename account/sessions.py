@@ -0,0 +1,122 @@
+"""
+Session engine with a write-back cache in front of the database.
+
+Sessions are read from and written to the ``SESSION_CACHE_ALIAS`` cache, the shared
+store (a Redis or Memcached server in production, a file or in-process cache as a
+local stand-in). A save whose data did not change is skipped, and a changed session
+only schedules a write of the database row ``SESSION_WRITE_BACK_DELAY`` seconds later,
+so repeated saves within that window cost one row update. New sessions still insert
+their row immediately to claim the key.
+
+Classes:
+    SessionStore: The session store used through ``SESSION_ENGINE = 'account.sessions'``.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FLUSH_KEY_PREFIX = 'account.sessions.flush:'
+
+
+class SessionStore(CachedDBStore):
+    """
+    Session store writing to the shared cache and writing the database back lazily.
+    """
+
+    cache_key_prefix = 'account.sessions:'
+
+    def load(self):
+        data = super().load()
+        self._snapshot = self.serializer().dumps(data)
+        return data
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None:
+            # A new session claims its key with an INSERT, which must not be deferred.
+            super().save(must_create)
+            self._snapshot = self.serializer().dumps(self._session)
+            return
+        data = self._get_session()
+        snapshot = self.serializer().dumps(data)
+        if snapshot == getattr(self, '_snapshot', None):
+            return
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        self._snapshot = snapshot
+        self._schedule_write_back()
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        session_key = session_key or self.session_key
+        if session_key:
+            self._cache.delete(FLUSH_KEY_PREFIX + session_key)
+
+    def _schedule_write_back(self):
+        """Schedules the database write of this session unless one is already pending."""
+        delay = settings.SESSION_WRITE_BACK_DELAY
+        if not self._cache.add(FLUSH_KEY_PREFIX + self.session_key, 1, delay * 10):
+            return
+        from config.celery import enqueue
+        from .tasks import write_back_session
+
+        try:
+            enqueue(write_back_session, (self.session_key,), countdown=delay)
+        except Exception as error:
+            logger.warning('Could not schedule the session write-back, writing through: %s', error)
+            self.write_back(self.session_key)
+
+    @classmethod
+    def write_back(cls, session_key):
+        """
+        Writes the cached data of a session to its database row.
+
+        Args:
+            session_key (str): The key of the session.
+
+        Returns:
+            bool: Whether a row was written; False if the session expired, was deleted or purged.
+        """
+        store = cls(session_key)
+        store._cache.delete(FLUSH_KEY_PREFIX + session_key)
+        data = store._cache.get(store.cache_key)
+        if data is None:
+            return False
+        store._session_cache = data
+        try:
+            DBStore.save(store)
+        except UpdateError:
+            return False
+        return True
+
+    @classmethod
+    def clear_expired(cls, batch_size=None, pause=None):
+        """
+        Deletes the expired sessions in chunks, pausing between them so the table is never locked for long.
+
+        Args:
+            batch_size (int): The number of rows per DELETE, ``SESSION_PURGE_BATCH_SIZE`` by default.
+            pause (float): The seconds to sleep between chunks, ``SESSION_PURGE_PAUSE`` by default.
+
+        Returns:
+            int: The number of deleted sessions.
+        """
+        batch_size = batch_size or settings.SESSION_PURGE_BATCH_SIZE
+        pause = settings.SESSION_PURGE_PAUSE if pause is None else pause
+        model = cls.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(model.objects.filter(expire_date__lt=now).values_list('pk', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(pk__in=keys, expire_date__lt=now).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+            time.sleep(pause)
@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from account.sessions import SessionStore
+
+
+@shared_task
+def write_back_session(session_key):
+    """Task writing the cached data of a session to the database."""
+    return SessionStore.write_back(session_key)
+
+
+@shared_task
+def purge_expired_sessions():
+    """Periodic task deleting expired sessions in small chunks."""
+    return SessionStore.clear_expired()
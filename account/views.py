@@ -1,12 +1,15 @@
 # Importing necessary modules and classes
+from asgiref.sync import sync_to_async  # Runs the session and ORM work of async views in the sync thread
 from django.contrib import messages, auth  # Module for displaying messages and authentication
 from django.contrib.auth import logout, authenticate
 from django.contrib.auth.decorators import login_required  # Decorator for login requirement
 from django.http import HttpResponse  # Module for HTTP responses
 from django.shortcuts import render, redirect  # Functions for rendering templates and redirecting
 from django.utils.decorators import method_decorator  # Decorator utility for methods
+from django.views import View  # Base class of the async views
 from rest_framework import status  # Module for HTTP status codes
 from rest_framework.views import APIView  # Class-based view for REST framework
+from config import asyncviews  # Helpers of the async views
 from .forms import RegistrationForm  # Importing RegistrationForm from local forms module
 from .models import Account  # Importing Account model from local models module
 
@@ -66,16 +69,16 @@ class Register(APIView):
         return render(request, 'accounts/register.html', context={'form': form, 'errors': form.errors})
 
 
-class Login(APIView):
+class Login(View):
     """
-    View class for user login.
+    Async view class for user login.
 
     Methods:
     - get: Handles GET requests for login page.
     - post: Handles POST requests for user login form submission.
     """
 
-    def get(self, request):
+    async def get(self, request):
         """
         Handles GET requests for login page.
 
@@ -85,12 +88,15 @@ class Login(APIView):
         Returns:
         - HttpResponse: Rendered login page.
         """
-        return render(request, 'accounts/login.html')
+        return await asyncviews.render(request, 'accounts/login.html')
 
-    def post(self, request):
+    async def post(self, request):
         """
         Handles POST requests for user login form submission.
 
+        The password hashing of ``authenticate`` runs in the blocking work thread pool,
+        so a login neither blocks the event loop nor queues behind the sync thread.
+
         Args:
         - request: HTTP request object.
 
@@ -100,9 +106,9 @@ class Login(APIView):
         """
         email = request.POST['email']
         password = request.POST['password']
-        user = authenticate(email=email, password=password)
+        user = await asyncviews.run_in_thread_pool(authenticate, email=email, password=password)
         if user is not None:
-            auth.login(request, user)
+            await sync_to_async(auth.login)(request, user)
             messages.success(request, "با موفقیت وارد حساب کاربری خود شدید")
             return redirect('dashboard')
         else:
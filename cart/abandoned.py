@@ -0,0 +1,123 @@
+"""
+Garbage collector of abandoned anonymous carts.
+
+A cart is abandoned when it was created and last active more than
+``CART_ABANDONED_TTL`` seconds ago and none of its lines belongs to a user. Carts
+are collected in batches of ``CART_GC_BATCH_SIZE``, each deleted in its own short
+transaction with its variation links, stock reservations (whose stock goes back
+to the products), lines and cart header, with a pause of ``CART_GC_PAUSE`` seconds
+between batches so the tables are never locked for long.
+
+Functions:
+    abandoned_carts: Returns the abandoned carts.
+    collect: Deletes the abandoned carts in batches and returns the statistics.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cart.models import Cart, CartHeader, CartItem, StockReservation
+from store.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def abandoned_carts(now=None):
+    """
+    Returns the abandoned carts.
+
+    Args:
+        now (datetime): The reference time, the current time by default.
+
+    Returns:
+        QuerySet: The carts older and inactive for longer than ``CART_ABANDONED_TTL`` with no user's lines.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.CART_ABANDONED_TTL)
+    return (Cart.objects.filter(date_added__lt=cutoff, last_activity__lt=cutoff)
+            .exclude(carts__user__isnull=False).order_by('id'))
+
+
+def _delete_batch(carts, now):
+    """
+    Deletes a batch of ``(id, cart_id)`` carts and everything hanging off them, returning the row counts.
+
+    The carts are locked and checked again so a cart used since it was selected is kept.
+    The stock of the lines' reservations goes back to the products before the carts
+    are deleted, their lines, variation links and reservations going with them.
+    """
+    stats = {}
+    with transaction.atomic():
+        carts = list(abandoned_carts(now).select_for_update()
+                     .filter(id__in=[pk for pk, _ in carts]).values_list('id', 'cart_id'))
+        cart_ids = [pk for pk, _ in carts]
+        reservations = list(StockReservation.objects.select_for_update()
+                            .filter(cart_item__cart_id__in=cart_ids).values_list('product_id', 'quantity'))
+        returned = defaultdict(int)
+        for product_id, quantity in reservations:
+            returned[product_id] += quantity
+        # Products are updated in id order so concurrent batches cannot deadlock
+        for product_id in sorted(returned):
+            Product.objects.filter(id=product_id).update(stock=F('stock') + returned[product_id])
+        _, deleted = Cart.objects.filter(id__in=cart_ids).delete()
+        stats['headers'] = CartHeader.objects.filter(
+            key__in=[CartHeader.key_for(cart_id=cart_id) for _, cart_id in carts]).delete()[0]
+    through = CartItem.variation.through._meta.label
+    for name, label in (('carts', 'cart.Cart'), ('items', 'cart.CartItem'), ('variations', through),
+                        ('reservations', 'cart.StockReservation')):
+        stats[name] = deleted.get(label, 0)
+    return stats
+
+
+def _count_batch(carts):
+    """Counts the rows a batch of ``(id, cart_id)`` carts would reclaim, without deleting anything."""
+    items = CartItem.objects.filter(cart_id__in=[pk for pk, _ in carts])
+    return {
+        'reservations': StockReservation.objects.filter(cart_item__in=items).count(),
+        'variations': CartItem.variation.through.objects.filter(cartitem__in=items).count(),
+        'items': items.count(),
+        'headers': CartHeader.objects.filter(
+            key__in=[CartHeader.key_for(cart_id=cart_id) for _, cart_id in carts]).count(),
+        'carts': len(carts),
+    }
+
+
+def collect(dry_run=False, batch_size=None, pause=None):
+    """
+    Deletes the abandoned carts in batches and returns the statistics.
+
+    Args:
+        dry_run (bool): Whether to only count the rows that would be reclaimed.
+        batch_size (int): The number of carts per batch, ``CART_GC_BATCH_SIZE`` by default.
+        pause (float): The seconds to sleep between batches, ``CART_GC_PAUSE`` by default.
+
+    Returns:
+        dict: The number of carts, items, variations, reservations and headers reclaimed,
+        the number of batches and the seconds spent.
+    """
+    batch_size = batch_size or settings.CART_GC_BATCH_SIZE
+    pause = settings.CART_GC_PAUSE if pause is None else pause
+    started = time.monotonic()
+    now = timezone.now()
+    stats = defaultdict(int)
+    last_id = 0
+    while True:
+        carts = list(abandoned_carts(now).filter(id__gt=last_id).values_list('id', 'cart_id')[:batch_size])
+        if not carts:
+            break
+        last_id = carts[-1][0]
+        for name, count in (_count_batch(carts) if dry_run else _delete_batch(carts, now)).items():
+            stats[name] += count
+        stats['batches'] += 1
+        if len(carts) < batch_size:
+            break
+        time.sleep(pause)
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    logger.info('%s abandoned carts: %s', 'Found' if dry_run else 'Collected', dict(stats))
+    return dict(stats)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, StockReservation
 
 
 class CartAdmin(admin.ModelAdmin):
@@ -8,6 +8,10 @@ class CartAdmin(admin.ModelAdmin):
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('cart', 'product', 'quantity', 'is_active', )
 
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('cart_item', 'product', 'quantity', 'expires_at', )
+
 
 admin.site.register(Cart, CartAdmin)
-admin.site.register(CartItem, CartItemAdmin)
\ No newline at end of file
+admin.site.register(CartItem, CartItemAdmin)
+admin.site.register(StockReservation, StockReservationAdmin)
\ No newline at end of file
@@ -1,6 +1,62 @@
-# Importing models and functions from the current package
-from .models import Cart, CartItem  # Importing models for Cart and CartItem
-from .views import _cart_id  # Importing function for retrieving cart ID
+# Importing models from the current package
+from .models import CartHeader  # Importing model for the cart header
+
+def cart_count(request):
+    """
+    Returns the number of items in the visitor's cart.
+
+    The count is read from the cart header with a single primary-key lookup and kept on
+    the request, so the page validators and the cart badge share it. A visitor without a
+    session has no cart, so no session is created here.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        int: The number of items in the shopping cart.
+    """
+    if hasattr(request, '_cart_count'):
+        return request._cart_count
+    key = _header_key(request)
+    if key is None:
+        request._cart_count = 0
+    else:
+        request._cart_count = CartHeader.objects.filter(key=key).values_list('item_count', flat=True).first() or 0
+    return request._cart_count
+
+
+async def acart_count(request):
+    """
+    Async-safe ``cart_count``, reading the cart header with the async ORM.
+
+    The user must already be resolved, as ``config.asyncviews.prepare`` does. The
+    count is memoised the same way, so ``counter`` then renders without a query.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        int: The number of items in the shopping cart.
+    """
+    if hasattr(request, '_cart_count'):
+        return request._cart_count
+    key = _header_key(request)
+    if key is None:
+        request._cart_count = 0
+    else:
+        request._cart_count = await CartHeader.objects.filter(key=key).values_list(
+            'item_count', flat=True).afirst() or 0
+    return request._cart_count
+
+
+def _header_key(request):
+    """Returns the key of the visitor's cart header, or None for a visitor without a session."""
+    if request.user.is_authenticated:
+        return CartHeader.key_for(user_id=request.user.pk)
+    if request.session.session_key:
+        return CartHeader.key_for(cart_id=request.session.session_key)
+    return None
+
 
 def counter(request):
     """
@@ -12,21 +68,7 @@ def counter(request):
     Returns:
         dict: A dictionary containing the count of items in the shopping cart.
     """
-    cart_count = 0
     # Check if the current path is not in the admin section
     if 'admin' in request.path:
         return {}
-    else:
-        try:
-            # Try to retrieve the cart and cart items
-            cart = Cart.objects.filter(cart_id=_cart_id(request))
-            if request.user.is_authenticated:
-                cart_items = CartItem.objects.all().filter(user=request.user)
-            else:
-                cart_items = CartItem.objects.all().filter(cart=cart[:1])
-            # Calculate the total number of items in the cart
-            for cart_item in cart_items:
-                cart_count += cart_item.quantity
-        except Cart.DoesNotExist:
-            cart_count = 0
-    return dict(cart_count=cart_count)
+    return dict(cart_count=cart_count(request))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from cart import abandoned
+
+
+class Command(BaseCommand):
+    """
+    Management command deleting abandoned anonymous carts, as the daily
+    collect-abandoned-carts task does, and printing what was reclaimed.
+    """
+    help = 'Deletes anonymous carts inactive for longer than CART_ABANDONED_TTL in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be reclaimed.')
+        parser.add_argument('--batch-size', type=int, help='Number of carts per batch.')
+        parser.add_argument('--pause', type=float, help='Seconds to pause between batches.')
+
+    def handle(self, *args, **options):
+        stats = abandoned.collect(dry_run=options['dry_run'], batch_size=options['batch_size'],
+                                  pause=options['pause'])
+        verb = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats.get('carts', 0)} carts, {stats.get('items', 0)} items, "
+            f"{stats.get('variations', 0)} variation links, {stats.get('reservations', 0)} reservations and "
+            f"{stats.get('headers', 0)} cart headers in {stats.get('batches', 0)} batches "
+            f"({stats['seconds']}s)."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+
+from cart.models import CartHeader, CartItem
+
+
+class Command(BaseCommand):
+    """
+    Management command rebuilding every cart header from the cart items.
+
+    Use it to repair headers after data was changed outside the cart views,
+    for example when product prices change.
+    """
+    help = 'Rebuilds the item count and subtotal of every cart header from CartItem.'
+
+    def handle(self, *args, **options):
+        totals = {'item_count': Sum('quantity'), 'subtotal': Sum(F('quantity') * F('product__unit_price'))}
+        headers = [
+            CartHeader(key=CartHeader.key_for(user_id=row['user']), item_count=row['item_count'],
+                       subtotal=row['subtotal'])
+            for row in CartItem.objects.filter(user__isnull=False).values('user').annotate(**totals)
+        ]
+        headers += [
+            CartHeader(key=CartHeader.key_for(cart_id=row['cart__cart_id']), item_count=row['item_count'],
+                       subtotal=row['subtotal'])
+            for row in CartItem.objects.filter(user__isnull=True, cart__isnull=False)
+            .values('cart__cart_id').annotate(**totals)
+        ]
+        with transaction.atomic():
+            CartHeader.objects.all().delete()
+            CartHeader.objects.bulk_create(headers, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(headers)} cart headers.'))
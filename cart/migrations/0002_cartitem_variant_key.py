@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+def backfill_variant_keys(apps, schema_editor):
+    """Computes the variant signature of existing lines and merges duplicates."""
+    CartItem = apps.get_model('cart', 'CartItem')
+    seen = {}
+    for item in CartItem.objects.prefetch_related('variation').order_by('id'):
+        ids = sorted(variation.pk for variation in item.variation.all())
+        key = f"{item.product_id}:{'-'.join(str(pk) for pk in ids)}"
+        owner = ('user', item.user_id) if item.user_id else ('cart', item.cart_id)
+        if (owner, key) in seen:
+            kept = seen[(owner, key)]
+            kept.quantity += item.quantity
+            kept.save(update_fields=['quantity'])
+            item.delete()
+            continue
+        item.variant_key = key
+        item.save(update_fields=['variant_key'])
+        seen[(owner, key)] = item
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='variant_key',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_variant_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'variant_key'), name='cart_item_user_variant_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('cart', 'variant_key'), name='cart_item_cart_variant_key'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_price_alter_product_price'),
+        ('cart', '0002_cartitem_variant_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('cart_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='cart.cartitem')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='store.product')),
+            ],
+        ),
+    ]
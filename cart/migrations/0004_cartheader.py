@@ -0,0 +1,40 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:38
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_cart_headers(apps, schema_editor):
+    """Creates the header of every existing cart from its items."""
+    CartHeader = apps.get_model('cart', 'CartHeader')
+    CartItem = apps.get_model('cart', 'CartItem')
+    totals = {'item_count': Sum('quantity'), 'subtotal': Sum(F('quantity') * F('product__price__price'))}
+    headers = [
+        CartHeader(key=f"user:{row['user']}", item_count=row['item_count'], subtotal=row['subtotal'])
+        for row in CartItem.objects.filter(user__isnull=False).values('user').annotate(**totals)
+    ]
+    headers += [
+        CartHeader(key=f"cart:{row['cart__cart_id']}", item_count=row['item_count'], subtotal=row['subtotal'])
+        for row in CartItem.objects.filter(user__isnull=True, cart__isnull=False)
+        .values('cart__cart_id').annotate(**totals)
+    ]
+    CartHeader.objects.bulk_create(headers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_stockreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartHeader',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('item_count', models.IntegerField(default=0)),
+                ('subtotal', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_cart_headers, migrations.RunPython.noop),
+    ]
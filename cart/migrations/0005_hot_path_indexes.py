@@ -0,0 +1,60 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Moves the lines of carts sharing a cart_id into the oldest of them so cart_id can be unique."""
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    StockReservation = apps.get_model('cart', 'StockReservation')
+    duplicated = Cart.objects.values('cart_id').annotate(carts=Count('id')).filter(carts__gt=1)
+    for cart_id in duplicated.values_list('cart_id', flat=True):
+        kept, *others = Cart.objects.filter(cart_id=cart_id).order_by('id')
+        lines = {item.variant_key: item for item in CartItem.objects.filter(cart=kept, user__isnull=True)}
+        for item in CartItem.objects.filter(cart__in=others).order_by('id'):
+            if item.user_id is None and item.variant_key in lines:
+                line = lines[item.variant_key]
+                line.quantity += item.quantity
+                line.save(update_fields=['quantity'])
+                # Keep the stock reserved for the merged line instead of losing it with the row.
+                reservation = StockReservation.objects.filter(cart_item=item).first()
+                if reservation is not None:
+                    if StockReservation.objects.filter(cart_item=line).update(
+                            quantity=models.F('quantity') + reservation.quantity):
+                        reservation.delete()
+                    else:
+                        reservation.cart_item = line
+                        reservation.save(update_fields=['cart_item'])
+                item.delete()
+                continue
+            item.cart = kept
+            item.save(update_fields=['cart'])
+            if item.user_id is None:
+                lines[item.variant_key] = item
+        Cart.objects.filter(pk__in=[cart.pk for cart in others]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_cartheader'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cart',
+            name='cart_id',
+            field=models.CharField(blank=True, max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', 'is_active'], name='cart_item_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'product'], name='cart_item_cart_product_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_last_activity(apps, schema_editor):
+    """Starts the activity of existing carts at their creation time."""
+    Cart = apps.get_model('cart', 'Cart')
+    Cart.objects.update(last_activity=models.F('date_added'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='last_activity',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 # Importing necessary modules and functions
+from datetime import timedelta  # Resolution of the cart activity time
+
 from django.contrib.auth import get_user_model  # Function to retrieve the User model
-from django.db import models  # Module for defining database models
+from django.db import connection, models  # Module for defining database models
+from django.utils import timezone  # Current time for the cart activity
 from store.models import Product, Variation  # Importing models for Product and Variation
 from account.models import Account  # Importing model for Account
 
@@ -15,10 +18,24 @@ class Cart(models.Model):
     Attributes:
         cart_id (str): The ID of the cart.
         date_added (DateTimeField): The date and time when the cart was created.
+        last_activity (DateTimeField): The date and time the cart was last changed, to within ACTIVITY_RESOLUTION.
     """
 
-    cart_id = models.CharField(max_length=255, blank=True)
+    # Activity is recorded at most this often, so adding items does not rewrite the cart row every time
+    ACTIVITY_RESOLUTION = timedelta(hours=1)
+
+    cart_id = models.CharField(max_length=255, blank=True, unique=True)
     date_added = models.DateTimeField(auto_now_add=True)
+    last_activity = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def touch(self):
+        """
+        Records activity on the cart if the last recorded activity is older than ACTIVITY_RESOLUTION.
+        """
+        now = timezone.now()
+        if now - self.last_activity >= self.ACTIVITY_RESOLUTION:
+            Cart.objects.filter(pk=self.pk).update(last_activity=now)
+            self.last_activity = now
 
     def __str__(self):
         """
@@ -29,6 +46,75 @@ class Cart(models.Model):
         """
         return self.cart_id
 
+def variant_key(product_id, variations):
+    """
+    Builds the canonical variant signature of a cart line.
+
+    The signature is a SKU-style key made of the product id and the sorted ids
+    of the selected variations, so the same selection always maps to the same key.
+
+    Args:
+        product_id (int): The ID of the product.
+        variations (iterable): The selected Variation objects or their IDs.
+
+    Returns:
+        str: The variant signature, e.g. ``"12:3-7"``.
+    """
+    ids = sorted(getattr(variation, 'pk', variation) for variation in variations)
+    return f"{product_id}:{'-'.join(str(pk) for pk in ids)}"
+
+
+# Manager for cart items providing the add-to-cart upsert
+class CartItemManager(models.Manager):
+    """
+    Manager for the CartItem model.
+
+    Methods:
+        add_line(): Creates a cart line or increments its quantity in one statement.
+    """
+
+    def add_line(self, product, variations, user=None, cart=None):
+        """
+        Creates the cart line for a product/variation selection or increments it.
+
+        The line is upserted with a single ``INSERT ... ON CONFLICT DO UPDATE`` against
+        the unique variant signature of the owner (user or anonymous cart), so adding
+        an item costs one round trip no matter how many lines the cart holds.
+
+        Args:
+            product (Product): The product being added.
+            variations (list): The selected Variation objects.
+            user (Account): The owner of the line for authenticated users.
+            cart (Cart): The owner of the line for anonymous visitors.
+
+        Returns:
+            tuple: The ID of the cart line and a flag telling whether it was created.
+        """
+        key = variant_key(product.pk, variations)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        if user is not None:
+            owner_column, owner_id, predicate = 'user_id', user.pk, 'user_id IS NOT NULL'
+        else:
+            owner_column, owner_id, predicate = 'cart_id', cart.pk, 'user_id IS NULL'
+        sql = (
+            f"INSERT INTO {table} ({owner_column}, product_id, variant_key, quantity, is_active) "
+            f"VALUES (%s, %s, %s, 1, %s) "
+            f"ON CONFLICT ({owner_column}, variant_key) WHERE {predicate} "
+            f"DO UPDATE SET quantity = {table}.quantity + 1 "
+            f"RETURNING id, quantity"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [owner_id, product.pk, key, True])
+            item_id, quantity = cursor.fetchone()
+        created = quantity == 1
+        if created and variations:
+            through = self.model.variation.through
+            through.objects.bulk_create(
+                [through(cartitem_id=item_id, variation_id=variation.pk) for variation in variations]
+            )
+        return item_id, created
+
+
 # Model for representing an item in the shopping cart
 class CartItem(models.Model):
     """
@@ -39,6 +125,7 @@ class CartItem(models.Model):
         product (ForeignKey): The product added to the cart.
         variation (ManyToManyField): The variations of the product.
         cart (ForeignKey): The cart to which the item belongs.
+        variant_key (str): The canonical signature of the product and its variations.
         quantity (int): The quantity of the product in the cart.
         is_active (bool): Indicates whether the item is active or not.
     """
@@ -47,9 +134,24 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='carts')
     variation = models.ManyToManyField(Variation, blank=True)
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='carts', null=True)
+    variant_key = models.CharField(max_length=255, default='')
     quantity = models.IntegerField()
     is_active = models.BooleanField(default=True)
 
+    objects = CartItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'variant_key'], condition=models.Q(user__isnull=False),
+                                    name='cart_item_user_variant_key'),
+            models.UniqueConstraint(fields=['cart', 'variant_key'], condition=models.Q(user__isnull=True),
+                                    name='cart_item_cart_variant_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='cart_item_user_active_idx'),
+            models.Index(fields=['cart', 'product'], name='cart_item_cart_product_idx'),
+        ]
+
     def sub_total(self):
         """
         Calculates the subtotal for the cart item.
@@ -57,7 +159,7 @@ class CartItem(models.Model):
         Returns:
             float: The subtotal for the cart item.
         """
-        return self.product.price.price * self.quantity
+        return self.product.unit_price * self.quantity
 
     def __str__(self):
         """
@@ -67,3 +169,113 @@ class CartItem(models.Model):
             str: The name of the product.
         """
         return f'{self.product.product_name}'
+
+
+# Model for representing stock held by a cart line
+class StockReservation(models.Model):
+    """
+    Model for representing the stock reserved by a cart line.
+
+    The reserved units are already taken off ``Product.stock``; they are handed back
+    when the line is removed or when the reservation expires, and kept when the
+    order is placed.
+
+    Attributes:
+        cart_item (OneToOneField): The cart line holding the reservation.
+        product (ForeignKey): The reserved product.
+        quantity (int): The number of reserved units.
+        expires_at (DateTimeField): The date and time when the reservation is released.
+    """
+
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name='reservation')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the reservation.
+
+        Returns:
+            str: The reserved quantity and product.
+        """
+        return f'{self.quantity} x {self.product_id}'
+
+
+# Manager for cart headers providing the incremental update
+class CartHeaderManager(models.Manager):
+    """
+    Manager for the CartHeader model.
+
+    Methods:
+        apply(): Adds a change in item count and subtotal to a cart header.
+    """
+
+    def apply(self, key, item_count, subtotal):
+        """
+        Adds a change in item count and subtotal to a cart header in one statement.
+
+        The header is upserted, so it is created on the first mutation of a cart and
+        incremented in place afterwards. Call it in the transaction of the mutation.
+
+        Args:
+            key (str): The header key as returned by CartHeader.key_for().
+            item_count (int): The change in the number of items.
+            subtotal (int): The change in the subtotal.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        key_column = connection.ops.quote_name('key')
+        sql = (
+            f"INSERT INTO {table} ({key_column}, item_count, subtotal) VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET item_count = {table}.item_count + %s, "
+            f"subtotal = {table}.subtotal + %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [key, item_count, subtotal, item_count, subtotal])
+
+
+# Model for representing the totals of a shopping cart
+class CartHeader(models.Model):
+    """
+    Model for representing the denormalized totals of a shopping cart.
+
+    There is one header per user and one per anonymous cart, keyed so that the
+    cart badge is a single primary-key read. Headers are kept up to date by the
+    cart views and can be rebuilt with the ``rebuild_cart_headers`` command.
+
+    Attributes:
+        key (str): ``user:<id>`` for users or ``cart:<cart_id>`` for anonymous carts.
+        item_count (int): The number of items in the cart.
+        subtotal (int): The total price of the items in the cart.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    item_count = models.IntegerField(default=0)
+    subtotal = models.BigIntegerField(default=0)
+
+    objects = CartHeaderManager()
+
+    @staticmethod
+    def key_for(user_id=None, cart_id=None):
+        """
+        Returns the header key of a user or of an anonymous cart.
+
+        Args:
+            user_id (int): The ID of the authenticated user owning the cart.
+            cart_id (str): The ID of the anonymous cart.
+
+        Returns:
+            str: The header key.
+        """
+        if user_id is not None:
+            return f'user:{user_id}'
+        return f'cart:{cart_id}'
+
+    def __str__(self):
+        """
+        Returns a string representation of the cart header.
+
+        Returns:
+            str: The header key.
+        """
+        return self.key
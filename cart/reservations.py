@@ -0,0 +1,147 @@
+"""
+Stock reservation engine for the cart.
+
+Stock is taken off ``Product.stock`` when an item is added to the cart and recorded
+as a ``StockReservation`` of the cart line with an expiry. Every stock change is a
+single conditional ``UPDATE`` at the database, so concurrent buyers can neither lose
+updates nor oversell, and the product row is locked only for that statement.
+
+Functions:
+    reserve: Reserves stock for a cart line.
+    release: Hands the stock of a cart line back to the product.
+    commit: Turns the reservations of the ordered cart lines into sold stock.
+    release_expired: Releases expired reservations in batches.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cart.models import StockReservation
+from store.models import Product
+
+
+class OutOfStock(Exception):
+    """Raised when a product does not have enough stock left to reserve."""
+
+
+def _take_stock(product_id, quantity):
+    """
+    Atomically decrements the stock of a product if enough units are left.
+
+    Args:
+        product_id (int): The ID of the product.
+        quantity (int): The number of units to take.
+
+    Raises:
+        OutOfStock: If the product does not have enough stock.
+    """
+    taken = Product.objects.filter(id=product_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+    if not taken:
+        raise OutOfStock(product_id)
+
+
+def reserve(cart_item_id, product_id, quantity=1):
+    """
+    Reserves stock for a cart line and extends the expiry of its reservation.
+
+    The stock is decremented last, so the product row stays locked only until
+    the surrounding transaction commits.
+
+    Args:
+        cart_item_id (int): The ID of the cart line.
+        product_id (int): The ID of the product.
+        quantity (int): The number of units to reserve.
+
+    Raises:
+        OutOfStock: If the product does not have enough stock.
+    """
+    expires_at = timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL)
+    with transaction.atomic():
+        updated = StockReservation.objects.filter(cart_item_id=cart_item_id).update(
+            quantity=F('quantity') + quantity, expires_at=expires_at)
+        if not updated:
+            StockReservation.objects.create(cart_item_id=cart_item_id, product_id=product_id,
+                                            quantity=quantity, expires_at=expires_at)
+        _take_stock(product_id, quantity)
+
+
+def release(cart_item_id, quantity=None):
+    """
+    Hands the reserved stock of a cart line back to the product.
+
+    Args:
+        cart_item_id (int): The ID of the cart line.
+        quantity (int): The number of units to release, or None to release all of them.
+    """
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_for_update().filter(cart_item_id=cart_item_id).first()
+        if reservation is None:
+            return
+        if quantity is None or quantity >= reservation.quantity:
+            quantity = reservation.quantity
+            reservation.delete()
+        else:
+            reservation.quantity = F('quantity') - quantity
+            reservation.save(update_fields=['quantity'])
+        Product.objects.filter(id=reservation.product_id).update(stock=F('stock') + quantity)
+
+
+def commit(cart_items):
+    """
+    Turns the reservations of the ordered cart lines into sold stock.
+
+    Lines whose reservation expired, fully or in part, have the missing units
+    reserved again before the reservations are dropped.
+
+    Args:
+        cart_items (iterable): The CartItem objects being ordered.
+
+    Raises:
+        OutOfStock: If a line can no longer be covered by the stock.
+    """
+    cart_items = list(cart_items)
+    with transaction.atomic():
+        reserved = dict(StockReservation.objects.select_for_update().filter(cart_item__in=cart_items)
+                        .values_list('cart_item_id', 'quantity'))
+        for cart_item in cart_items:
+            missing = cart_item.quantity - reserved.get(cart_item.id, 0)
+            if missing > 0:
+                _take_stock(cart_item.product_id, missing)
+        StockReservation.objects.filter(cart_item__in=cart_items).delete()
+
+
+def release_expired(batch_size=500):
+    """
+    Releases expired reservations in batches and returns their stock.
+
+    Each batch runs in its own short transaction and skips reservations locked by
+    concurrent requests; the stock is returned with one update per product.
+
+    Args:
+        batch_size (int): The maximum number of reservations released per batch.
+
+    Returns:
+        int: The number of released reservations.
+    """
+    released = 0
+    now = timezone.now()
+    while True:
+        with transaction.atomic():
+            batch = list(StockReservation.objects.select_for_update(skip_locked=True)
+                         .filter(expires_at__lte=now).order_by('id')
+                         .values_list('id', 'product_id', 'quantity')[:batch_size])
+            if not batch:
+                return released
+            totals = defaultdict(int)
+            for _, product_id, quantity in batch:
+                totals[product_id] += quantity
+            StockReservation.objects.filter(id__in=[reservation_id for reservation_id, _, _ in batch]).delete()
+            # Products are updated in id order so concurrent batches cannot deadlock
+            for product_id in sorted(totals):
+                Product.objects.filter(id=product_id).update(stock=F('stock') + totals[product_id])
+        released += len(batch)
@@ -0,0 +1,130 @@
+"""
+Cart summary service shared by the cart, checkout and order views.
+
+Classes:
+    CartSummary: The lines and totals of a visitor's cart, fetched with a constant number of queries.
+"""
+
+from django.db.models import F, Sum
+
+from cart.models import CartItem
+
+
+class CartSummary:
+    """
+    The lines and totals of a cart.
+
+    The lines are fetched with their product, category and variations in two
+    queries and the totals are computed by a single aggregate at the database, so the
+    number of queries does not depend on the size of the cart.
+
+    Attributes:
+        TAX_RATE: The tax rate in percent.
+        cart_items: The list of CartItem objects in the cart.
+        total: The total price of the items.
+        quantity: The total quantity of the items.
+        tax: The tax on the total price.
+        grand_total: The total price including tax.
+    """
+
+    TAX_RATE = 2
+
+    def __init__(self, cart_items):
+        """
+        Fetches the lines and computes the totals of a cart.
+
+        Args:
+            cart_items (QuerySet): The CartItem objects making up the cart.
+        """
+        self._set(list(self._lines(cart_items)), cart_items.aggregate(**self._totals()))
+
+    @classmethod
+    async def afetch(cls, cart_items):
+        """
+        Async constructor, fetching the lines and totals with the async ORM.
+
+        Args:
+            cart_items (QuerySet): The CartItem objects making up the cart.
+
+        Returns:
+            CartSummary: The summary of the cart.
+        """
+        summary = cls.__new__(cls)
+        summary._set([line async for line in cls._lines(cart_items)], await cart_items.aaggregate(**cls._totals()))
+        return summary
+
+    @staticmethod
+    def _lines(cart_items):
+        return cart_items.select_related('product__category').prefetch_related('variation')
+
+    @staticmethod
+    def _totals():
+        return {'total': Sum(F('quantity') * F('product__unit_price')), 'quantity': Sum('quantity')}
+
+    def _set(self, cart_items, totals):
+        self.cart_items = cart_items
+        self.total = totals['total'] or 0
+        self.quantity = totals['quantity'] or 0
+        self.tax = (self.TAX_RATE * self.total) / 100
+        self.grand_total = self.total + self.tax
+
+    @classmethod
+    def for_request(cls, request):
+        """
+        Returns the summary of the active lines of the visitor's cart.
+
+        Args:
+            request: HttpRequest object representing the HTTP request.
+
+        Returns:
+            CartSummary: The summary of the user's cart, or of the session cart for anonymous
+            visitors. A visitor without a session has an empty cart.
+        """
+        return cls(cls._request_lines(request))
+
+    @classmethod
+    async def afor_request(cls, request):
+        """
+        Async ``for_request``, for a request whose user is already resolved.
+
+        Args:
+            request: HttpRequest object representing the HTTP request.
+
+        Returns:
+            CartSummary: The summary of the visitor's cart.
+        """
+        return await cls.afetch(cls._request_lines(request))
+
+    @staticmethod
+    def _request_lines(request):
+        if request.user.is_authenticated:
+            cart_items = CartItem.objects.filter(user=request.user, is_active=True)
+        elif request.session.session_key:
+            cart_items = CartItem.objects.filter(cart__cart_id=request.session.session_key, is_active=True)
+        else:
+            cart_items = CartItem.objects.none()
+        return cart_items.order_by('id')
+
+    def __bool__(self):
+        """
+        Tells whether the cart has any lines.
+
+        Returns:
+            bool: True if the cart is not empty.
+        """
+        return bool(self.cart_items)
+
+    def context(self):
+        """
+        Returns the template context of the summary.
+
+        Returns:
+            dict: The cart items and totals.
+        """
+        return {
+            'total': self.total,
+            'quantity': self.quantity,
+            'cart_items': self.cart_items,
+            'tax': self.tax,
+            'grand_total': self.grand_total,
+        }
@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from cart import abandoned
+from cart.reservations import release_expired
+
+
+@shared_task
+def release_expired_reservations(batch_size=500):
+    """Periodic task releasing the stock of expired cart reservations."""
+    return release_expired(batch_size=batch_size)
+
+
+@shared_task
+def collect_abandoned_carts(dry_run=False):
+    """Periodic task deleting abandoned anonymous carts and returning the statistics."""
+    return abandoned.collect(dry_run=dry_run)
@@ -1,3 +1,45 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from cart.models import CartHeader, CartItem
+from config.queries import query_budget
+from store.tests import create_product, create_user
+
+
+class QueryBudgetTests(TestCase):
+    """Cart pages of a customer within their ``QUERY_BUDGETS``, with the per-process caches cold then warm."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+        cls.user = create_user()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        for variation in ({'color': 'red'}, {'size': 'large'}):
+            self.client.post(reverse('add_cart', args=[self.product.id]), variation)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+
+    def test_cart(self):
+        for _ in range(2):
+            with query_budget('cart'):
+                response = self.client.get(reverse('cart'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_checkout(self):
+        for _ in range(2):
+            with query_budget('checkout'):
+                response = self.client.get(reverse('checkout'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_delete_keeps_the_header_in_step(self):
+        self.client.post(reverse('add_cart', args=[self.product.id]), {'color': 'red'})
+        line = CartItem.objects.get(user=self.user, quantity=2)
+        for quantity in (1, 0):
+            self.client.get(reverse('delete', args=[self.product.id, line.id]))
+            header = CartHeader.objects.get(key=CartHeader.key_for(user_id=self.user.pk))
+            self.assertEqual(CartItem.objects.filter(id=line.id).values_list('quantity', flat=True).first() or 0,
+                             quantity)
+            self.assertEqual((header.item_count, header.subtotal), (quantity + 1, (quantity + 1) * 100))
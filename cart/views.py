@@ -1,28 +1,118 @@
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
 from rest_framework.views import APIView
 
-from cart.models import Cart, CartItem
-from store.models import Product, Variation
+from cart import reservations
+from config import asyncviews
+from cart.models import Cart, CartHeader, CartItem
+from cart.summary import CartSummary
+from store.models import Product, Variation, variation_category_choice
 from django.utils.decorators import method_decorator
 
 
-def _cart_id(request):
+def _cart_id(request, create=False):
     """
        Function to retrieve the session key for the cart.
 
+       Read paths treat a visitor without a session as having an empty cart, so a
+       session is only created when ``create`` is set by a cart mutation.
+
        Args:
            request: HttpRequest object representing the HTTP request.
+           create: Whether to create the session if the visitor has none.
 
        Returns:
-           str: The session key for the cart.
+           str: The session key for the cart, or None if there is none and create is not set.
     """
     cart = request.session.session_key
-    if not cart:
-        cart = request.session.create()
+    if not cart and create:
+        request.session.create()
+        cart = request.session.session_key
     return cart
 
 
+# Request headers announcing a speculative load rather than a user navigation
+PREFETCH_HEADERS = (('HTTP_SEC_PURPOSE', 'prefetch'), ('HTTP_PURPOSE', 'prefetch'), ('HTTP_X_MOZ', 'prefetch'),
+                    ('HTTP_X_PURPOSE', 'preview'))
+
+
+def _is_speculative(request):
+    """
+       Function to tell whether a GET request may mutate the cart.
+
+       Prefetches and previews are recognised from their headers, and a visitor
+       without a cart identity (no login and no session cookie, as with crawlers)
+       is not given a cart by following a link.
+
+       Args:
+           request: HttpRequest object representing the HTTP request.
+
+       Returns:
+           bool: True if the request must not change the cart.
+    """
+    if any(value in request.META.get(header, '').lower() for header, value in PREFETCH_HEADERS):
+        return True
+    return not request.user.is_authenticated and not request.session.session_key
+
+
+def _posted_variations(request, product):
+    """
+       Function to resolve the variations posted with an add-to-cart form.
+
+       All posted category/value pairs are matched against the product's variations
+       in a single query.
+
+       Args:
+           request: HttpRequest object representing the HTTP request.
+           product: The product being added to the cart.
+
+       Returns:
+           list: The matching Variation objects.
+    """
+    categories = dict(variation_category_choice)
+    lookups = Q()
+    for key, value in request.POST.items():
+        if key.lower() in categories:
+            lookups |= Q(variation_category__iexact=key, variation_value__iexact=value)
+    if not lookups:
+        return []
+    return list(Variation.objects.filter(lookups, product=product))
+
+
+def _add_line(request, product, variations):
+    """
+       Function to add one unit of a product selection to the visitor's cart.
+
+       The cart line is upserted, one unit of stock is reserved for it and the cart
+       header is updated in the same transaction, so a line is never added without
+       stock to back it.
+
+       Args:
+           request: HttpRequest object representing the HTTP request.
+           product: The product being added to the cart.
+           variations: The selected Variation objects.
+
+       Raises:
+           OutOfStock: If the product does not have any stock left.
+    """
+    with transaction.atomic():
+        # if the user is authenticated the line belongs to the user, otherwise to the session cart
+        if request.user.is_authenticated:
+            item_id, created = CartItem.objects.add_line(product, variations, user=request.user)
+            header_key = CartHeader.key_for(user_id=request.user.pk)
+        else:
+            cart, created = Cart.objects.get_or_create(cart_id=_cart_id(request, create=True))
+            if not created:
+                cart.touch()
+            item_id, created = CartItem.objects.add_line(product, variations, cart=cart)
+            header_key = CartHeader.key_for(cart_id=cart.cart_id)
+        CartHeader.objects.apply(header_key, 1, product.unit_price)
+        reservations.reserve(item_id, product.id)
+
+
 class AddCart(APIView):
     """
         API view for adding items to the cart.
@@ -40,157 +130,36 @@ class AddCart(APIView):
             Returns:
                 HttpResponseRedirect: Redirects to the cart page after adding the item.
         """
-        # Implementation of adding items to the cart
-        # (code omitted for brevity)
-
-        current_user = request.user
         product = get_object_or_404(Product, id=product_id)
-        # if the user is authenticated
-        if current_user.is_authenticated:
-            product_variation = []
-            for item in request.POST:
-                key = item
-                value = request.POST[key]
-
-                try:
-                    variation = Variation.objects.get(product=product, variation_category__iexact=key,
-                                                      variation_value__iexact=value)
-                    product_variation.append(variation)
-                except:
-                    pass
-
-            try:
-                cart = Cart.objects.get(cart_id=_cart_id(request))
-            except Cart.DoesNotExist:
-                cart = Cart.objects.create(
-                    cart_id=_cart_id(request)
-                )
-            cart.save()
-
-            is_cart_item_exists = CartItem.objects.filter(product=product, user=current_user).exists()
-            if is_cart_item_exists:
-                cart_item = CartItem.objects.filter(product=product, user=current_user)
-                # print(cart_items)
-                ex_var_list = []
-                id = []
-                for item in cart_item:
-                    existing_variation = item.variation.all()
-                    ex_var_list.append(list(existing_variation))
-                    id.append(item.id)
-                    # print(ex_var_list)
-                if product_variation in ex_var_list:
-                    index = ex_var_list.index(product_variation)
-                    item_id = id[index]
-                    item = CartItem.objects.get(product=product, id=item_id)
-                    item.quantity += 1
-                    item.save()
-                else:
-                    cart_item = CartItem.objects.create(product=product, quantity=1, user=current_user)
-                    if len(product_variation) > 0:
-                        for item in product_variation:
-                            cart_item.variation.add(item)
-                    # cart_item.quantity += 1
-                    cart_item.product.stock -= 1
-                    cart_item.product.save()
-                    cart_item.save()
-            else:
-
-                cart_item = CartItem.objects.create(product=product, user=current_user, quantity=1)
-
-                if len(product_variation) > 0:
-                    for item in product_variation:
-                        cart_item.variation.add(item)
-                cart_item.save()
-            return redirect('cart')
-        # if the user is not authenticated
-        else:
-            product_variation = []
-            for item in request.POST:
-                key = item
-                value = request.POST[key]
-
-                try:
-                    variation = Variation.objects.get(product=product, variation_category__iexact=key,
-                                                      variation_value__iexact=value)
-                    product_variation.append(variation)
-                except:
-                    pass
-
-            try:
-                cart = Cart.objects.get(cart_id=_cart_id(request))
-            except Cart.DoesNotExist:
-                cart = Cart.objects.create(
-                    cart_id=_cart_id(request)
-                )
-            cart.save()
-
-            is_cart_item_exists = CartItem.objects.filter(product=product, cart=cart).exists()
-            if is_cart_item_exists:
-                cart_item = CartItem.objects.filter(product=product, cart=cart)
-                # print(cart_items)
-                ex_var_list = []
-                id = []
-                for item in cart_item:
-                    existing_variation = item.variation.all()
-                    ex_var_list.append(list(existing_variation))
-                    id.append(item.id)
-                    # print(ex_var_list)
-                if product_variation in ex_var_list:
-                    index = ex_var_list.index(product_variation)
-                    item_id = id[index]
-                    item = CartItem.objects.get(product=product, id=item_id)
-                    item.quantity += 1
-                    item.save()
-                else:
-                    cart_item = CartItem.objects.create(product=product, cart=cart, quantity=1)
-                    if len(product_variation) > 0:
-                        for item in product_variation:
-                            cart_item.variation.add(item)
-                    # cart_item.quantity += 1
-                    cart_item.product.stock -= 1
-                    cart_item.product.save()
-                    cart_item.save()
-            else:
-                cart_item = CartItem.objects.create(product=product, cart=cart, quantity=1)
-
-                if len(product_variation) > 0:
-                    for item in product_variation:
-                        cart_item.variation.add(item)
-                cart_item.save()
-            return redirect('cart')
+        try:
+            _add_line(request, product, _posted_variations(request, product))
+        except reservations.OutOfStock:
+            messages.error(request, "Sorry, this product is out of stock.")
+        return redirect('cart')
 
     # GET method for adding items to the cart
     def get(self, request, product_id):
         """
                GET method for adding items to the cart.
 
+               Prefetchers, previews and crawlers following the link are sent to the
+               product page instead, without creating a session or a cart.
+
                Args:
                    request: HttpRequest object representing the HTTP request.
                    product_id: The ID of the product being added to the cart.
 
                Returns:
-                   HttpResponseRedirect: Redirects to the cart page after adding the item.
+                   HttpResponseRedirect: Redirects to the cart page after adding the item,
+                   or to the product page for speculative requests.
         """
-        # Implementation of adding items to the cart
-        # (code omitted for brevity)
-        product = get_object_or_404(Product, id=product_id)
-        try:
-            cart = Cart.objects.get(cart_id=_cart_id(request))
-        except Cart.DoesNotExist:
-            cart = Cart.objects.create(
-                cart_id=_cart_id(request)
-            )
-        cart.save()
-
+        product = get_object_or_404(Product.objects.select_related('category'), id=product_id)
+        if _is_speculative(request):
+            return redirect(product.get_url())
         try:
-            cart_item = CartItem.objects.get(product=product, cart=cart)
-            cart_item.quantity += 1
-            cart_item.product.stock -= 1
-            cart_item.product.save()
-            cart_item.save()
-        except CartItem.DoesNotExist:
-            cart_item = CartItem.objects.create(product=product, cart=cart, quantity=1)
-            cart_item.save()
+            _add_line(request, product, [])
+        except reservations.OutOfStock:
+            messages.error(request, "Sorry, this product is out of stock.")
         return redirect('cart')
 
 
@@ -217,61 +186,42 @@ class DeleteItem(APIView):
 
         try:
             if request.user.is_authenticated:
-                cart_item = CartItem.objects.get(product=product, user=request.user, id=cart_item_id)
+                cart_items = CartItem.objects.filter(product=product, user=request.user, id=cart_item_id)
+                header_key = CartHeader.key_for(user_id=request.user.pk)
+            elif _cart_id(request) is None:
+                return redirect('cart')
             else:
                 cart = Cart.objects.get(cart_id=_cart_id(request))
-                cart_item = CartItem.objects.get(product=product, cart=cart, id=cart_item_id)
-            if cart_item.quantity > 1:
-                cart_item.quantity -= 1
-                cart_item.save()
-            else:
-                cart_item.delete()
-        except CartItem.DoesNotExist:
+                cart_items = CartItem.objects.filter(product=product, cart=cart, id=cart_item_id)
+                header_key = CartHeader.key_for(cart_id=cart.cart_id)
+            with transaction.atomic():
+                # The line is locked, so a concurrent add cannot change its quantity until the header is adjusted
+                cart_item = cart_items.select_for_update().get()
+                reservations.release(cart_item.id, 1)
+                CartHeader.objects.apply(header_key, -1, -product.unit_price)
+                if cart_item.quantity > 1:
+                    cart_item.quantity -= 1
+                    cart_item.save(update_fields=['quantity'])
+                else:
+                    cart_item.delete()
+        except (Cart.DoesNotExist, CartItem.DoesNotExist):
             pass
         return redirect('cart')
 
 
-def cart(request, total=0, quantity=0, cart_item=None):
+async def cart(request):
     """
-        Function-based view for displaying the cart.
+        Async function-based view for displaying the cart.
 
         Args:
             request: HttpRequest object representing the HTTP request.
-            total (int): The total price of items in the cart.
-            quantity (int): The total quantity of items in the cart.
-            cart_item: The cart item being displayed.
 
         Returns:
             HttpResponse: Renders the cart template with cart data.
     """
-    # Implementation of displaying the cart
-    # (code omitted for brevity)
-    try:
-        tax = 0
-        grand_total = 0
-        if request.user.is_authenticated:
-            print(request.user.is_authenticated)
-            cart_items = CartItem.objects.filter(user=request.user, is_active=True)
-            print(cart_items)
-        else:
-            cart = get_object_or_404(Cart, cart_id=_cart_id(request))
-            cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-        for cart_item in cart_items:
-            total += (cart_item.product.price.price * cart_item.quantity)
-            quantity = cart_item.quantity
-        tax = (2 * total) / 100
-        grand_total = total + tax
-    except CartItem.DoesNotExist:
-        pass
-    context = {
-        'total': total,
-        'quantity': quantity,
-        'cart_items': cart_items,
-        'tax': tax,
-        'grand_total': grand_total,
-    }
-
-    return render(request, 'store/cart.html', context=context)
+    await asyncviews.prepare(request)
+    summary = await CartSummary.afor_request(request)
+    return await asyncviews.render(request, 'store/cart.html', context=summary.context())
 
 # Class-based view for checkout process
 @method_decorator(login_required(login_url='login'), name='dispatch')
@@ -281,47 +231,15 @@ class Checkout(APIView):
     """
 
     # GET method for the checkout process
-    def get(self, request, total=0, quantity=0, cart_item=None, current_user=None):
+    def get(self, request):
         """
                 GET method for the checkout process.
 
                 Args:
                     request: HttpRequest object representing the HTTP request.
-                    total (int): The total price of items in the cart.
-                    quantity (int): The total quantity of items in the cart.
-                    cart_item: The cart item being displayed.
-                    current_user: The current authenticated user.
 
                 Returns:
                     HttpResponse: Renders the checkout template with checkout data.
         """
-        # Implementation of the checkout process
-        # (code omitted for brevity)
-        try:
-            tax = 0
-            grand_total = 0
-            if request.user.is_authenticated:
-                print(request.user.is_authenticated)
-                cart_items = CartItem.objects.filter(user=request.user, is_active=True)
-                print(cart_items)
-            else:
-                cart = get_object_or_404(Cart, cart_id=_cart_id(request))
-                cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-            for cart_item in cart_items:
-                total += (cart_item.product.price.price * cart_item.quantity)
-                quantity = cart_item.quantity
-            tax = (2 * total) / 100
-            grand_total = total + tax
-        except CartItem.DoesNotExist:
-            pass
-        context = {
-            'total': total,
-            'quantity': quantity,
-            'cart_items': cart_items,
-            'tax': tax,
-            'grand_total': grand_total,
-        }
-
-        return render(request, 'store/checkout.html', context=context)
-
-
+        summary = CartSummary.for_request(request)
+        return render(request, 'store/checkout.html', context=summary.context())
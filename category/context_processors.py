@@ -1,9 +1,9 @@
-# Importing models for Category and GiftCategory from the current directory
-from .models import Category, GiftCategory
+# Importing the cached menus from the current directory
+from .menu import categories
 
 def menu_links(request):
     """
-    Function to retrieve category links for the menu.
+    Function to retrieve category links for the menu from the per-process menu cache.
 
     Args:
         request: HttpRequest object representing the HTTP request.
@@ -12,7 +12,7 @@ def menu_links(request):
         dict: A dictionary containing category links.
     """
     # Retrieve all category objects
-    links = Category.objects.all()
+    links = categories(request)
     return dict(links=links)
 
 # def gifts(request):
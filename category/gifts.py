@@ -1,9 +1,9 @@
-from category.models import GiftCategory
+from category.menu import gift_categories
 
 
 def gifts(request):
     """
-    Function to retrieve gift category links.
+    Function to retrieve gift category links from the per-process menu cache.
 
     Args:
         request: HttpRequest object representing the HTTP request.
@@ -12,5 +12,5 @@ def gifts(request):
         dict: A dictionary containing gift category links.
     """
     # Retrieve all gift category objects
-    gifts = GiftCategory.objects.all()
+    gifts = gift_categories(request)
     return dict(gifts=gifts)
\ No newline at end of file
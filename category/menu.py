@@ -0,0 +1,127 @@
+"""
+Per-process cache of the category and gift menus.
+
+Every process keeps the menu rows in memory together with the version they were
+loaded at. The version lives in the shared Django cache and is bumped by the
+``post_save``/``post_delete`` receivers in ``category.signals``, so a render costs
+one cache read and the tables are only queried again after a change.
+
+Functions:
+    menu_version: Returns the current shared menu version.
+    amenu_version: Async menu_version.
+    bump_menu_version: Invalidates the menus in every process.
+    categories: Returns the cached categories.
+    gift_categories: Returns the cached gift categories.
+    aload_menus: Async-safe loading of both menus for a request.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from .models import Category, GiftCategory
+
+MENU_VERSION_KEY = 'category:menu-version'
+
+_menus = {}
+
+
+def menu_version():
+    """
+    Returns the current shared menu version, initialising it if the cache lost it.
+
+    Returns:
+        int: The menu version.
+    """
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+async def amenu_version():
+    """Async ``menu_version``, reading the shared cache without blocking the event loop."""
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is None:
+        await cache.aadd(MENU_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    """Invalidates the menus cached by every process."""
+    cache.set(MENU_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _cached(name, queryset):
+    """
+    Returns the rows of a menu, reloading them if the shared version changed.
+
+    Args:
+        name (str): The name of the menu.
+        queryset (QuerySet): The query loading the menu rows.
+
+    Returns:
+        list: The menu rows.
+    """
+    version = menu_version()
+    entry = _menus.get(name)
+    if entry is None or entry[0] != version:
+        entry = (version, list(queryset))
+        _menus[name] = entry
+    return entry[1]
+
+
+def categories(request=None):
+    """
+    Returns the cached categories.
+
+    Args:
+        request: The HTTP request, whose menus loaded by ``aload_menus`` are returned if any.
+
+    Returns:
+        list: The Category objects.
+    """
+    if request is not None and hasattr(request, '_menus'):
+        return request._menus['categories']
+    return _cached('categories', Category.objects.all())
+
+
+def gift_categories(request=None):
+    """
+    Returns the cached gift categories.
+
+    Args:
+        request: The HTTP request, whose menus loaded by ``aload_menus`` are returned if any.
+
+    Returns:
+        list: The GiftCategory objects.
+    """
+    if request is not None and hasattr(request, '_menus'):
+        return request._menus['gift_categories']
+    return _cached('gift_categories', GiftCategory.objects.all())
+
+
+async def _acached(name, queryset):
+    """Async-safe ``_cached``, reloading the rows with the async ORM."""
+    version = await amenu_version()
+    entry = _menus.get(name)
+    if entry is None or entry[0] != version:
+        entry = (version, [row async for row in queryset])
+        _menus[name] = entry
+    return entry[1]
+
+
+async def aload_menus(request):
+    """
+    Loads both menus for a request with the async ORM and keeps them on the request.
+
+    The menu context processors then render them without a query, even if the
+    version is bumped in the meantime.
+
+    Args:
+        request: The HTTP request.
+    """
+    request._menus = {'categories': await _acached('categories', Category.objects.all()),
+                      'gift_categories': await _acached('gift_categories', GiftCategory.objects.all())}
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:13
+
+import config.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0002_category_modified_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='cat_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='giftcategory',
+            name='gift_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='cat_image',
+            field=models.ImageField(blank=True, storage=config.storage.content_storage, upload_to='photos/categories'),
+        ),
+        migrations.AlterField(
+            model_name='giftcategory',
+            name='gift_image',
+            field=models.ImageField(blank=True, storage=config.storage.content_storage, upload_to='photos/categories'),
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.db import models  # Module for defining Django models
 # Importing reverse function from django.urls
 from django.urls import reverse  # Function for reversing URLs
 
+# Importing the content-addressed media storage
+from config.storage import content_storage  # Storage naming uploads after their content hash
+
 # Define a model for representing product categories
 class Category(models.Model):
     """
@@ -14,6 +17,8 @@ class Category(models.Model):
         slug: SlugField representing the slugified version of the category name.
         description: TextField representing the description of the category.
         cat_image: ImageField representing the image associated with the category.
+        cat_image_derivatives: JSONField holding the resized and WebP versions of the image.
+        modified_date: DateTimeField representing the date and time when the category was last modified.
 
     Methods:
         get_url: Method to return the URL for viewing products in this category.
@@ -23,7 +28,9 @@ class Category(models.Model):
     category_name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
-    cat_image = models.ImageField(upload_to='photos/categories', blank=True)
+    cat_image = models.ImageField(upload_to='photos/categories', blank=True, storage=content_storage)
+    cat_image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    modified_date = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Category'
@@ -57,6 +64,7 @@ class GiftCategory(models.Model):
         slug: SlugField representing the slugified version of the gift category name.
         description: TextField representing the description of the gift category.
         gift_image: ImageField representing the image associated with the gift category.
+        gift_image_derivatives: JSONField holding the resized and WebP versions of the image.
 
     Methods:
         get_url: Method to return the URL for viewing products in this gift category.
@@ -66,7 +74,8 @@ class GiftCategory(models.Model):
     gift_name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
-    gift_image = models.ImageField(upload_to='photos/categories', blank=True)
+    gift_image = models.ImageField(upload_to='photos/categories', blank=True, storage=content_storage)
+    gift_image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Gift'
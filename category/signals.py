@@ -0,0 +1,29 @@
+# Importing necessary modules for handling signals
+from django.db import transaction  # Module for database transactions
+from django.db.models.signals import post_delete, post_save  # Signals for save and delete events on models
+from django.dispatch import receiver  # Decorator for connecting receivers to signals
+
+# Importing the menu models and cache from the current directory
+from .menu import bump_menu_version  # Function invalidating the cached menus
+from .models import Category, GiftCategory  # Models shown in the menus
+
+# Define a receiver to handle changes to the menu models
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=GiftCategory)
+@receiver(post_delete, sender=GiftCategory)
+def menu_changed(sender, **kwargs):
+    """
+    Receiver function invalidating the cached menus when a category changes.
+
+    The version is bumped once the transaction commits, so no process reloads the
+    menus before the change is visible.
+
+    Args:
+        sender: The sender model class.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    transaction.on_commit(bump_menu_version)
@@ -0,0 +1,200 @@
+"""
+Helpers for the async (ASGI) views.
+
+Django 4.2 can run views natively on the event loop, but the session, the lazy
+``request.user`` and the template context processors are synchronous and reach the
+database. ``prepare`` resolves the user and loads the session in one hop to the sync
+thread and primes the per-request memos of the context processors with the async
+ORM, so rendering afterwards does not touch the database. It still reads and writes
+the cached template fragments, so it runs in the ``BLOCKING_WORK_THREADS`` pool
+rather than blocking the event loop on the cache.
+The conditional GET and ``Vary`` decorators of Django 4.2 only wrap sync views, so
+async variants live here.
+
+Functions:
+    prepare: Loads everything the context processors need for a request.
+    render: Renders a template for a prepared request.
+    get_object_or_404: Async ``get_object_or_404``.
+    condition: Async ``django.views.decorators.http.condition``.
+    vary_on_cookie: Async ``django.views.decorators.vary.vary_on_cookie``.
+    method_decorator: ``django.utils.decorators.method_decorator`` for async methods.
+    run_in_thread_pool: Runs blocking CPU-bound work in the ``BLOCKING_WORK_THREADS`` pool.
+"""
+
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render as render_sync
+from django.utils import decorators
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+_pool = None
+
+
+def _load_request(request):
+    """Evaluates the lazy user, which loads the session, and the flash messages stored in it."""
+    request.user.is_authenticated
+    request.session.keys()
+
+
+async def prepare(request):
+    """
+    Loads everything the context processors need for a request.
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        The resolved user of the request.
+    """
+    if getattr(request, '_prepared', False):
+        return request.user
+    from cart.context_processors import acart_count
+    from category.menu import aload_menus
+
+    await sync_to_async(_load_request)(request)
+    await acart_count(request)
+    await aload_menus(request)
+    request._prepared = True
+    return request.user
+
+
+async def render(request, template_name, context=None, status=None):
+    """
+    Renders a template for a request in the blocking work pool, preparing it first.
+
+    Args:
+        request: The HTTP request.
+        template_name (str): The template to render.
+        context (dict): The template context, whose querysets must already be evaluated.
+        status (int): The response status.
+
+    Returns:
+        HttpResponse: The rendered response.
+    """
+    await prepare(request)
+    return await run_in_thread_pool(render_sync, request, template_name, context, status=status)
+
+
+async def get_object_or_404(queryset, **kwargs):
+    """
+    Returns the object matching ``kwargs`` with the async ORM, raising Http404 if there is none.
+
+    Args:
+        queryset: A model or a queryset.
+
+    Returns:
+        The matching object.
+    """
+    queryset = getattr(queryset, '_default_manager', queryset)
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+def condition(etag_func=None, last_modified_func=None):
+    """
+    Async ``condition`` decorator answering conditional GETs from sync validator functions.
+
+    The validators run in the sync thread, after the request is prepared, so they may
+    use the ORM, the session and the memoised cart count.
+
+    Args:
+        etag_func: Function returning the ETag of a request, or None.
+        last_modified_func: Function returning the modification time of a request, or None.
+
+    Returns:
+        The decorator.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            await prepare(request)
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+
+            def validators():
+                etag = etag_func(request, *args, **kwargs) if etag_func else None
+                modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+                return (quote_etag(etag) if etag is not None else None,
+                        int(modified.timestamp()) if modified else None)
+
+            etag, last_modified = await sync_to_async(validators)()
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag and not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+            return response
+
+        return inner
+
+    return decorator
+
+
+def vary_on_cookie(view):
+    """Async ``vary_on_cookie`` decorator."""
+    @functools.wraps(view)
+    async def inner(request, *args, **kwargs):
+        response = await view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    return inner
+
+
+def method_decorator(decorator, name):
+    """
+    ``django.utils.decorators.method_decorator`` for async methods.
+
+    Django 4.2 wraps the decorated method in a sync function, which ``View`` would then
+    run as a sync handler, so the wrapper is marked as a coroutine function.
+
+    Args:
+        decorator: A decorator or a list of decorators of async views.
+        name (str): The name of the method to decorate.
+
+    Returns:
+        The class decorator.
+    """
+    def decorate(cls):
+        cls = decorators.method_decorator(decorator, name=name)(cls)
+        markcoroutinefunction(getattr(cls, name))
+        return cls
+
+    return decorate
+
+
+async def run_in_thread_pool(function, *args, **kwargs):
+    """
+    Runs blocking CPU-bound work such as password hashing in the ``BLOCKING_WORK_THREADS`` pool.
+
+    The work does not go to the single thread that runs the sync code of every
+    request, so it holds up neither the event loop nor the other requests' ORM calls.
+    Database connections opened by the work are closed according to ``CONN_MAX_AGE``
+    like those of a request.
+
+    Returns:
+        The result of ``function``.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.BLOCKING_WORK_THREADS, thread_name_prefix='blocking-work')
+
+    def call():
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False, executor=_pool)()
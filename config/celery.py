@@ -0,0 +1,59 @@
+"""
+Celery application for the config project.
+
+Settings prefixed with ``CELERY_`` in ``config.settings`` configure the app, and
+tasks are discovered from the ``tasks`` module of every installed app.
+
+Functions:
+    enqueue: Sends a task from a request without waiting on an unreachable broker.
+"""
+
+import os
+import time
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+_broker_down_until = 0.0
+
+
+class BrokerUnavailable(Exception):
+    """Raised instead of sending a task while the broker is known to be unreachable."""
+
+
+def enqueue(task, args=(), kwargs=None, **options):
+    """
+    Sends a task from a request without waiting on an unreachable broker.
+
+    The task is published once, without retries. When the broker cannot be reached,
+    the process stops trying for ``TASK_ENQUEUE_BACKOFF`` seconds, so the callers fall
+    back at once instead of each paying the connection timeout.
+
+    Args:
+        task: The Celery task.
+        args (tuple): The positional arguments of the task.
+        kwargs (dict): The keyword arguments of the task.
+        **options: The options of ``apply_async``, such as ``countdown``.
+
+    Returns:
+        AsyncResult: The result of the sent task.
+
+    Raises:
+        BrokerUnavailable: If the broker was unreachable less than ``TASK_ENQUEUE_BACKOFF`` seconds ago.
+        Exception: The error of the broker connection.
+    """
+    from django.conf import settings
+
+    global _broker_down_until
+    if time.monotonic() < _broker_down_until:
+        raise BrokerUnavailable('The broker was unreachable less than TASK_ENQUEUE_BACKOFF seconds ago.')
+    try:
+        return task.apply_async(args, kwargs, retry=False, **options)
+    except Exception:
+        _broker_down_until = time.monotonic() + settings.TASK_ENQUEUE_BACKOFF
+        raise
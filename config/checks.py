@@ -0,0 +1,38 @@
+"""
+System checks of the project configuration.
+
+Functions:
+    check_shared_cache: Warns when the default cache is not shared by the processes.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries other processes cannot see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warns when the default cache is not shared by the processes.
+
+    The menus, facet and autocomplete indexes are kept in every process and rebuilt
+    when their version in the default cache changes; with a process-local cache an
+    edit made through one process never reaches the others.
+
+    Returns:
+        list: The warnings.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'The default cache {backend} is local to each process.',
+        hint='Other processes keep serving stale menus, facets and ETags after an edit; configure a shared '
+             'backend with CACHE_BACKEND and CACHE_LOCATION, such as the file cache or a cache server.',
+        id='config.W001',
+    )]
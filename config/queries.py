@@ -0,0 +1,203 @@
+"""
+SQL query budgets and N+1 detection.
+
+Every query run while a recorder is installed through ``connection.execute_wrapper``
+is counted and grouped by its normalised shape, the SQL with literals, parameters and
+``IN`` lists replaced by placeholders. A shape repeated ``QUERY_REPEAT_THRESHOLD``
+times in one request is reported as an N+1, together with the template line or the
+project source line that fired it.
+
+Classes:
+    QueryRecorder: The execute wrapper counting and grouping queries.
+    QueryBudgetMiddleware: Logs the views exceeding their budget or firing N+1 queries.
+    query_budget: Context manager and decorator failing when a block exceeds a budget.
+
+Functions:
+    normalize_sql: Returns the shape of a SQL statement.
+"""
+
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator, ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def normalize_sql(sql):
+    """
+    Returns the shape of a SQL statement.
+
+    Args:
+        sql (str): The SQL statement.
+
+    Returns:
+        str: The statement with literals and parameters replaced by ``?`` and ``IN`` lists collapsed.
+    """
+    return _LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+def _origin():
+    """Returns the template line or project source line running the current query."""
+    frame = sys._getframe(2)
+    source = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type() rather than isinstance() so lazy objects such as request.user are not evaluated.
+        if issubclass(type(node), Node) and getattr(node, 'token', None) is not None and node.origin is not None:
+            return f'{node.origin.template_name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if source is None and filename.startswith(PROJECT_ROOT) and filename != __file__ \
+                and 'site-packages' not in filename:
+            source = f'{Path(filename).relative_to(PROJECT_ROOT)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return source or 'unknown'
+
+
+class QueryRecorder:
+    """
+    The execute wrapper counting and grouping queries.
+
+    Attributes:
+        count: The number of queries run.
+        shapes: The number of queries per normalised shape.
+        origins: The lines that ran each shape.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = Counter()
+        self.origins = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = normalize_sql(sql)
+        self.count += 1
+        self.shapes[shape] += 1
+        self.origins[shape][_origin()] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold=None):
+        """
+        Returns the shapes run at least ``threshold`` times, most repeated first.
+
+        Args:
+            threshold (int): The repetitions making a shape an N+1, ``QUERY_REPEAT_THRESHOLD`` by default.
+
+        Returns:
+            list: ``(shape, count, origins)`` tuples.
+        """
+        threshold = threshold or settings.QUERY_REPEAT_THRESHOLD
+        return [(shape, count, self.origins[shape]) for shape, count in self.shapes.most_common()
+                if count >= threshold]
+
+    def report(self, threshold=None):
+        """Returns a readable summary of the repeated shapes."""
+        return '\n'.join(
+            f'{count}x {shape}\n    from ' + ', '.join(f'{origin} ({hits})' for origin, hits in origins.items())
+            for shape, count, origins in self.repeated(threshold)
+        )
+
+    def install(self, stack):
+        """Installs the recorder on every database connection until ``stack`` closes."""
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+
+class QueryBudgetMiddleware:
+    """
+    Logs the views exceeding their query budget or firing N+1 queries.
+
+    Budgets come from ``QUERY_BUDGETS`` keyed by URL name. The middleware is only
+    active when ``QUERY_BUDGET_ENABLED`` is set, as finding the origin of each query
+    walks the stack. It runs in the mode of the handler, so the async views are not
+    pushed through a thread by it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with ExitStack() as stack:
+            recorder = QueryRecorder().install(stack)
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are per thread: the recorder goes on those of the thread running the
+        # request's sync_to_async calls, not of the event loop
+        stack = ExitStack()
+        recorder = await sync_to_async(QueryRecorder().install)(stack)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        """Logs the queries of a request over its budget and the repeated query shapes."""
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        budget = settings.QUERY_BUDGETS.get(view)
+        if budget is not None and recorder.count > budget:
+            logger.warning('%s ran %d queries, over its budget of %d.', view, recorder.count, budget)
+        if recorder.repeated():
+            logger.warning('%s repeated query shapes (possible N+1):\n%s', view, recorder.report())
+
+
+class query_budget(ContextDecorator):
+    """
+    Context manager and decorator failing when a block exceeds a query budget.
+
+    Example::
+
+        with query_budget('cart'):
+            client.get(reverse('cart'))
+
+    Args:
+        budget (int or str): The maximum number of queries, or a URL name of ``QUERY_BUDGETS``.
+        allow_repeats (bool): Whether repeated query shapes are tolerated.
+    """
+
+    def __init__(self, budget, allow_repeats=False):
+        self.budget = settings.QUERY_BUDGETS[budget] if isinstance(budget, str) else budget
+        self.allow_repeats = allow_repeats
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self.recorder = QueryRecorder().install(self._stack)
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is not None:
+            return False
+        if self.recorder.count > self.budget:
+            raise AssertionError(f'{self.recorder.count} queries run, over the budget of {self.budget}:\n'
+                                 + '\n'.join(f'{count}x {shape}' for shape, count in self.recorder.shapes.items()))
+        if not self.allow_repeats and self.recorder.repeated():
+            raise AssertionError(f'Repeated query shapes (possible N+1):\n{self.recorder.report()}')
+        return False
@@ -0,0 +1,185 @@
+"""
+Views serving files from disk.
+
+Files are answered with validators for conditional requests and support single
+``Range`` requests. A file compressed ahead of time, with ``.br`` and ``.gz``
+siblings written by ``collectstatic``, is sent in the best encoding the client
+accepts. Files whose name carries a hash of their content never change, so they are
+sent with far-future immutable cache headers.
+
+Functions:
+    serve_media: Serves uploaded media, with immutable cache headers for content-addressed files.
+    serve_static: Serves collected static files, precompressed, with immutable cache headers for hashed names.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from config.storage import is_content_addressed
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_hashed_static_names = None
+
+
+def _accepted_encodings(header):
+    """Returns the content codings an ``Accept-Encoding`` header allows."""
+    accepted, refused, wildcard = set(), set(), False
+    for part in header.split(','):
+        coding, _, params = part.strip().lower().partition(';')
+        quality = re.search(r'q=([\d.]+)', params)
+        allowed = not quality or float(quality.group(1) or 0) > 0
+        if coding == '*':
+            wildcard = allowed
+        elif coding:
+            (accepted if allowed else refused).add(coding)
+    if wildcard:
+        accepted |= {coding for coding, _ in ENCODINGS} - refused
+    return accepted
+
+
+def _byte_range(header, size):
+    """
+    Returns the ``(first, last)`` bytes of a single range request, None for a header
+    served with the whole file, or False when the range is unsatisfiable.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        # Malformed and multiple ranges are answered with the whole file
+        return None
+    first, last = match.groups()
+    if first == '':
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        return False
+    return first, last
+
+
+def _read_range(path, first, last, block_size=FileResponse.block_size):
+    with open(path, 'rb') as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(block_size, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _serve(request, root, path, immutable):
+    """
+    Serves a file under a root directory.
+
+    Args:
+        request: The HTTP request.
+        root: The directory the files are served from.
+        path (str): The path of the file under ``root``.
+        immutable (bool): Whether the file content never changes.
+
+    Returns:
+        HttpResponseBase: The file, a part of it, a 304 or a 416 response.
+    """
+    try:
+        fullpath = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path.')
+    if not os.path.isfile(fullpath):
+        raise Http404(f'"{path}" does not exist.')
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    # Ranges address the identity encoding, the only one whose length the client can know
+    ranged = 'HTTP_RANGE' in request.META
+    accepted = set() if ranged else _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding, selected, compressed = None, fullpath, False
+    for coding, suffix in ENCODINGS:
+        if os.path.isfile(fullpath + suffix):
+            compressed = True
+            if encoding is None and coding in accepted:
+                encoding, selected = coding, fullpath + suffix
+
+    stat = os.stat(selected)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}' + (f'-{encoding}' if encoding else ''))
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        byte_range = None
+        if ranged and request.headers.get('If-Range', etag) in (etag, http_date(last_modified)):
+            byte_range = _byte_range(request.headers['Range'], stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416, content_type=content_type)
+            response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range:
+            first, last = byte_range
+            response = StreamingHttpResponse(_read_range(selected, first, last), status=206,
+                                             content_type=content_type)
+            response.headers['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+            response.headers['Content-Length'] = last - first + 1
+        else:
+            response = FileResponse(open(selected, 'rb'), content_type=content_type)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    if compressed:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if immutable:
+        patch_cache_control(response, public=True, max_age=settings.IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.FILES_MAX_AGE)
+    return response
+
+
+def serve_media(request, path):
+    """
+    Serves an uploaded media file from ``MEDIA_ROOT``.
+
+    Files named after their content hash never change, so browsers and proxies may
+    keep them for ``IMMUTABLE_MAX_AGE`` without revalidating.
+
+    Args:
+        request: The HTTP request.
+        path (str): The path of the file under ``MEDIA_ROOT``.
+
+    Returns:
+        HttpResponseBase: The file, a part of it, a 304 or a 416 response.
+    """
+    return _serve(request, settings.MEDIA_ROOT, path, is_content_addressed(path))
+
+
+def serve_static(request, path):
+    """
+    Serves a file collected in ``STATIC_ROOT``, in its precompressed variant when the client accepts it.
+
+    The names listed in the ``collectstatic`` manifest carry the hash of their content
+    and are sent with immutable cache headers; the unhashed copies are revalidated after
+    ``FILES_MAX_AGE``. The manifest is read once per process, like the storage reads it.
+
+    Args:
+        request: The HTTP request.
+        path (str): The path of the file under ``STATIC_ROOT``.
+
+    Returns:
+        HttpResponseBase: The file, a part of it, a 304 or a 416 response.
+    """
+    global _hashed_static_names
+    if _hashed_static_names is None:
+        _hashed_static_names = frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    return _serve(request, settings.STATIC_ROOT, path, path in _hashed_static_names)
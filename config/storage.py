@@ -0,0 +1,171 @@
+"""
+Content-addressed media storage and precompressed static files storage.
+
+Uploaded files are stored under the SHA-256 of their content, as
+``<directory>/<first two hex digits>/<digest><extension>``, instead of their upload
+name. Identical uploads therefore share one file, and a name never changes content,
+so these files can be served with immutable cache headers.
+
+``collectstatic`` copies the static files under names carrying a hash of their
+content, listed in ``staticfiles.json``, and writes brotli (``.br``) and gzip
+(``.gz``) siblings of the text assets for ``config.serve.serve_static``.
+
+Classes:
+    ContentAddressedStorage: File system storage naming files after their content hash.
+    CompressedManifestStaticFilesStorage: Manifest static files storage writing compressed siblings.
+
+Functions:
+    content_storage: Returns the shared content-addressed storage, for ``FileField(storage=...)``.
+    is_content_addressed: Tells whether a storage name is a content hash.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import uuid
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+CONTENT_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+# Static files worth compressing; images other than SVG and WOFF fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf',
+                           '.eot'}
+# A compressed sibling is only kept when it is smaller than this share of the file
+COMPRESSION_MAX_RATIO = 0.95
+
+_storage = None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the SHA-256 of their content and writing each content once."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known from the content, in _save
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        hexdigest = digest.hexdigest()
+        name = os.path.join(directory, hexdigest[:2], hexdigest + extension).replace('\\', '/')
+        if not self.exists(name):
+            # Written aside and moved into place, so concurrent writers of one content cannot clash
+            temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+            os.replace(self.path(temporary), self.path(name))
+        return name
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest static files storage also writing brotli and gzip siblings of the text assets.
+
+    A sibling is only rewritten when the file is newer, so running ``collectstatic``
+    again compresses only the files it copied. A reference to a file that is not
+    shipped, like the source map named by ``bootstrap.css``, is left as it is instead of
+    failing the collection.
+
+    A name missing from the manifest, as before ``collectstatic`` has run, is served
+    unhashed rather than failing the page.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.manifest_strict:
+                raise
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError as error:
+                logger.warning('Left a reference of %s unhashed: %s', name, error)
+                return matchobj.group(0)
+
+        return convert
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for compressed in self.compress(name):
+                    yield name, compressed, True
+
+    def compress(self, name):
+        """
+        Writes the brotli and gzip siblings of a file.
+
+        Args:
+            name (str): The storage name of the file.
+
+        Yields:
+            str: The names of the siblings written.
+        """
+        import brotli
+
+        path = self.path(name)
+        modified = os.path.getmtime(path)
+        data = None
+        for suffix, encode in (('.br', lambda data: brotli.compress(data, quality=11)),
+                               ('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))):
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= modified:
+                continue
+            if data is None:
+                with open(path, 'rb') as file:
+                    data = file.read()
+            compressed = encode(data)
+            if len(compressed) >= len(data) * COMPRESSION_MAX_RATIO:
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            temporary = f'{target}.{uuid.uuid4().hex}.tmp'
+            with open(temporary, 'wb') as file:
+                file.write(compressed)
+            os.replace(temporary, target)
+            yield name + suffix
+
+
+def content_storage():
+    """
+    Returns the shared content-addressed storage, for ``FileField(storage=...)``.
+
+    Returns:
+        ContentAddressedStorage: The storage rooted at ``MEDIA_ROOT``.
+    """
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def is_content_addressed(name):
+    """
+    Tells whether a storage name is a content hash, whose content never changes.
+
+    Args:
+        name (str): The storage name or URL path.
+
+    Returns:
+        bool: True for names written by ``ContentAddressedStorage``.
+    """
+    return bool(CONTENT_NAME.search(name))
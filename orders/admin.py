@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import Order
+from .models import Order, OrderProduct, OutboxEvent, SmsMessage
+
+
+class OrderProductInline(admin.TabularInline):
+    model = OrderProduct
+    readonly_fields = ['user', 'product', 'variation', 'quantity', 'product_price', 'ordered']
+    extra = 0
 
 
 class OrderAdmin(admin.ModelAdmin):
@@ -7,6 +13,29 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'is_ordered']
     search_fields = ['order_number', 'first_name', 'last_name', 'phone', 'email']
     list_per_page = 20
+    inlines = [OrderProductInline]
 
 
 admin.site.register(Order, OrderAdmin)
+
+
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ['receptor', 'order', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['receptor', 'order__order_number']
+    readonly_fields = ['provider_id', 'last_error']
+    list_select_related = ['order']
+    list_per_page = 20
+
+
+admin.site.register(SmsMessage, SmsMessageAdmin)
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'attempts', 'created_at', 'available_at', 'published_at']
+    list_filter = ['topic']
+    readonly_fields = ['topic', 'payload', 'created_at', 'attempts', 'last_error', 'published_at']
+    list_per_page = 20
+
+
+admin.site.register(OutboxEvent, OutboxEventAdmin)
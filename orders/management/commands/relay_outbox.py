@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders import outbox
+
+
+class Command(BaseCommand):
+    """
+    Management command running the outbox relay, which publishes the events written
+    with the orders to Celery in batches. Run it as a long-lived process next to the
+    Celery worker; several relays may run at once.
+    """
+    help = 'Publishes the pending outbox events to Celery in batches, polling until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit.')
+        parser.add_argument('--batch-size', type=int, help='Number of events per batch.')
+        parser.add_argument('--interval', type=float, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--stats', action='store_true', help='Only print the backlog of the outbox.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.write_metrics()
+        interval = options['interval'] or settings.OUTBOX_POLL_INTERVAL
+        publisher = outbox.CeleryPublisher()
+        while True:
+            stats = outbox.drain(publisher, batch_size=options['batch_size'])
+            if stats['published'] or stats['failed']:
+                self.stdout.write(
+                    f"Published {stats['published']} events, {stats['failed']} failed, in {stats['batches']} "
+                    f"batches (lag max {stats['max_lag']}s, mean {stats['mean_lag']}s).")
+            if options['once']:
+                return self.write_metrics()
+            # Back off after a failure, otherwise poll again once the backlog is drained
+            if stats['failed'] or not stats['published']:
+                time.sleep(interval)
+
+    def write_metrics(self):
+        metrics = outbox.lag_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f"{metrics['pending']} events pending, {metrics['retrying']} retrying, "
+            f"oldest {metrics['oldest_age']}s old."))
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders import sms
+from orders.models import SmsMessage
+
+
+class Command(BaseCommand):
+    """
+    Management command measuring the throughput of the SMS dispatcher offline, sending
+    unsaved messages through the fake provider under the configured rate limit.
+    """
+    help = 'Benchmarks the SMS dispatcher against the fake provider without touching the database or network.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Number of messages to send.')
+        parser.add_argument('--rate', type=float, help='Messages per second, SMS_RATE_LIMIT by default.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds each fake send takes.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of fake sends failing.')
+
+    def handle(self, *args, **options):
+        provider = sms.FakeProvider(latency=options['latency'], failure_rate=options['failure_rate'])
+        rate = options['rate'] or settings.SMS_RATE_LIMIT
+        messages = [SmsMessage(receptor=f'0912{number:07d}', template=settings.SMS_ORDER_TEMPLATE,
+                               tokens={'token': 'benchmark', 'token10': str(number)})
+                    for number in range(options['messages'])]
+        started = time.monotonic()
+        stats = sms.send_batch(messages, provider, sms.RateLimiter(rate))
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {stats['sent']}, retried {stats['retried']} and failed {stats['failed']} of "
+            f"{len(messages)} messages in {seconds:.3f}s ({len(messages) / seconds:.1f} messages/s, "
+            f"limit {rate:g}/s)."))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_alter_order_is_ordered'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'order_number'], name='order_user_number_idx'),
+        ),
+    ]
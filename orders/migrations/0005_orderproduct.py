@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_modified_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0004_order_user_number_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('product_price', models.IntegerField()),
+                ('ordered', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_products', to='orders.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_products', to='store.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_products', to=settings.AUTH_USER_MODEL)),
+                ('variation', models.ManyToManyField(blank=True, to='store.variation')),
+            ],
+        ),
+    ]
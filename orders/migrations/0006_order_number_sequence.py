@@ -0,0 +1,51 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:56
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def start_order_numbers(apps, schema_editor):
+    """
+    Renumbers orders without a unique number and starts the order number allocator
+    after the highest order id, so new numbers cannot collide with the date + id ones.
+    """
+    Order = apps.get_model('orders', 'Order')
+    OrderNumberCounter = apps.get_model('orders', 'OrderNumberCounter')
+    duplicated = Order.objects.values('order_number').annotate(orders=Count('id')).filter(orders__gt=1)
+    for order_number in duplicated.values_list('order_number', flat=True):
+        for order in Order.objects.filter(order_number=order_number).order_by('id')[1:]:
+            order.order_number = f"legacy{order.id}"
+            order.save(update_fields=['order_number'])
+    start = (Order.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"CREATE SEQUENCE orders_order_number_seq START WITH {start} CACHE 20")
+    else:
+        OrderNumberCounter.objects.create(name='order_number', value=start - 1)
+
+
+def drop_order_numbers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS orders_order_number_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_orderproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(start_order_numbers, drop_order_numbers),
+        migrations.AlterField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
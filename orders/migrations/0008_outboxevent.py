@@ -0,0 +1,39 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_smsmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='smsmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', False)), fields=('order', 'template'), name='sms_message_order_template_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('published_at__isnull', True)), fields=['available_at', 'id'], name='outbox_event_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('published_at__isnull', False)), fields=['published_at'], name='outbox_event_published_idx'),
+        ),
+    ]
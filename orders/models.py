@@ -1,9 +1,47 @@
 # Importing necessary module for defining Django models
-from django.db import models  # Module for defining Django models
+from django.db import connections, models  # Module for defining Django models
+from django.utils import timezone  # Current date for order numbers
 
 # Importing the Account model from the account app
 from account.models import Account  # Model representing user accounts
 
+# Importing the store models snapshotted by the order lines
+from store.models import Product, Variation  # Models for the ordered products and their variations
+
+# Manager for orders providing the allocation of order numbers
+class OrderManager(models.Manager):
+    """Manager for the Order model providing the allocation of order numbers."""
+
+    # Name of the PostgreSQL sequence backing the order numbers
+    SEQUENCE = 'orders_order_number_seq'
+
+    def next_order_number(self):
+        """
+        Allocates the next order number, so it is known before the order is inserted.
+
+        On PostgreSQL the number comes from a sequence, whose values are never handed out
+        twice and are cached per connection in blocks. Other databases increment a row of
+        OrderNumberCounter in the current transaction.
+
+        Returns:
+            str: The current date followed by the allocated number, e.g. ``"2024030112"``.
+        """
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT nextval(%s)", [self.SEQUENCE])
+            else:
+                table = connection.ops.quote_name(OrderNumberCounter._meta.db_table)
+                cursor.execute(
+                    f"INSERT INTO {table} (name, value) VALUES (%s, 1) "
+                    f"ON CONFLICT (name) DO UPDATE SET value = {table}.value + 1 "
+                    f"RETURNING value",
+                    ['order_number'],
+                )
+            number = cursor.fetchone()[0]
+        return f"{timezone.localdate():%Y%m%d}{number}"
+
+
 # Define a model for representing orders
 class Order(models.Model):
     """
@@ -44,7 +82,7 @@ class Order(models.Model):
         ('Cancelled', 'Cancelled')
     )
     user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="orders")
-    order_number = models.CharField(max_length=20)
+    order_number = models.CharField(max_length=20, unique=True)
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     phone = models.CharField(max_length=15)
@@ -63,6 +101,13 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'order_number'], name='order_user_number_idx'),
+        ]
+
     def __str__(self):
         """
         Method to return a string representation of the order.
@@ -89,3 +134,191 @@ class Order(models.Model):
             String: The full address of the customer.
         """
         return f"{self.address_line_1} {self.address_line_2}"
+
+
+# Define a model for counting order numbers on databases without sequences
+class OrderNumberCounter(models.Model):
+    """
+    Model for counting order numbers on databases without sequences.
+
+    Attributes:
+        name: CharField representing the name of the counter.
+        value: BigIntegerField representing the last allocated value.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+# Manager for order lines providing the snapshot of a cart
+class OrderProductManager(models.Manager):
+    """Manager for the OrderProduct model providing the snapshot of a cart."""
+
+    def create_from_cart(self, order, cart_items):
+        """
+        Creates the lines of an order from the cart lines it was placed from.
+
+        The lines and their variation links are written with one bulk insert each,
+        so the number of statements does not depend on the size of the cart.
+
+        Args:
+            order (Order): The placed order.
+            cart_items (list): The CartItem objects, with their product and variations fetched.
+
+        Returns:
+            list: The created OrderProduct objects.
+        """
+        lines = self.bulk_create([
+            OrderProduct(order=order, user_id=order.user_id, product=cart_item.product,
+                         quantity=cart_item.quantity, product_price=cart_item.product.unit_price)
+            for cart_item in cart_items
+        ])
+        through = OrderProduct.variation.through
+        through.objects.bulk_create([
+            through(orderproduct_id=line.pk, variation_id=variation.pk)
+            for line, cart_item in zip(lines, cart_items) for variation in cart_item.variation.all()
+        ])
+        return lines
+
+
+# Define a model for representing the lines of an order
+class OrderProduct(models.Model):
+    """
+    Model for representing the lines of an order, a snapshot of the cart lines it was placed from.
+
+    Attributes:
+        order: ForeignKey representing the order the line belongs to.
+        user: ForeignKey representing the user who placed the order.
+        product: ForeignKey representing the ordered product.
+        variation: ManyToManyField representing the selected variations of the product.
+        quantity: IntegerField representing the ordered quantity.
+        product_price: IntegerField representing the unit price of the product when the order was placed.
+        ordered: BooleanField indicating whether the line was ordered.
+        created_at: DateTimeField representing the date and time when the line was created.
+        updated_at: DateTimeField representing the date and time when the line was last updated.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_products')
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='order_products')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_products')
+    variation = models.ManyToManyField(Variation, blank=True)
+    quantity = models.IntegerField()
+    product_price = models.IntegerField()
+    ordered = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderProductManager()
+
+    def sub_total(self):
+        """
+        Method to return the price of the line.
+
+        Returns:
+            Integer: The unit price multiplied by the quantity.
+        """
+        return self.product_price * self.quantity
+
+    def __str__(self):
+        """
+        Method to return a string representation of the order line.
+
+        Returns:
+            String: The name of the product.
+        """
+        return self.product.product_name
+
+
+# Define a model for tracking the delivery of order notifications
+class SmsMessage(models.Model):
+    """
+    Model for tracking the delivery of an order notification by SMS.
+
+    Attributes:
+        STATUS: Choices for the delivery state of the message.
+        order: ForeignKey representing the order the message is about.
+        receptor: CharField representing the phone number the message is sent to.
+        template: CharField representing the provider template of the message.
+        tokens: JSONField representing the values filled into the template.
+        status: CharField representing the delivery state of the message.
+        attempts: PositiveIntegerField representing the number of sending attempts.
+        next_attempt_at: DateTimeField representing when the message is due to be sent or retried.
+        last_error: TextField representing the error of the last failed attempt.
+        provider_id: CharField representing the id the provider gave the message.
+        created_at: DateTimeField representing the date and time when the message was queued.
+        sent_at: DateTimeField representing the date and time when the message was sent.
+    """
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='sms_messages', null=True)
+    receptor = models.CharField(max_length=15)
+    template = models.CharField(max_length=100)
+    tokens = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    provider_id = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_message_due_idx'),
+        ]
+        constraints = [
+            # An order event delivered twice must not send its notification twice
+            models.UniqueConstraint(fields=['order', 'template'], condition=models.Q(order__isnull=False),
+                                    name='sms_message_order_template_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.receptor} ({self.status})"
+
+
+# Define a model for the events written with the order, relayed to the consumers after commit
+class OutboxEvent(models.Model):
+    """
+    Model for an event written in the transaction that caused it and relayed to its consumers after commit.
+
+    Attributes:
+        topic: CharField representing the kind of event, such as 'order.created'.
+        payload: JSONField representing the data of the event.
+        created_at: DateTimeField representing the date and time when the event was written.
+        available_at: DateTimeField representing when the event is due to be relayed or retried.
+        attempts: PositiveIntegerField representing the number of failed relay attempts.
+        last_error: TextField representing the error of the last failed attempt.
+        published_at: DateTimeField representing the date and time when the event was relayed.
+    """
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at', 'id'], condition=models.Q(published_at__isnull=True),
+                         name='outbox_event_pending_idx'),
+            models.Index(fields=['published_at'], condition=models.Q(published_at__isnull=False),
+                         name='outbox_event_published_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
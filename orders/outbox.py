@@ -0,0 +1,211 @@
+"""
+Transactional outbox for order events.
+
+Events are written as ``OutboxEvent`` rows in the transaction that causes them, so
+placing an order never waits on the broker and an event exists exactly when its order
+does. The relay process (``manage.py relay_outbox``) drains the pending events in
+batches of ``OUTBOX_BATCH_SIZE`` and hands each one to a publisher; the Celery
+publisher sends the task routed to its topic by ``OUTBOX_ROUTES``. An event is only
+marked published after its publisher returned, so delivery is at least once: a relay
+dying between the two publishes the event again, and consumers receive the
+``event_id`` to recognise a repeat. A publish failure stops the batch and retries the
+event with exponential backoff, as the broker is most likely down.
+
+Classes:
+    CeleryPublisher: Sends each event as the Celery task routed to its topic.
+    InMemoryBroker: Collects events in memory, a broker stand-in for tests.
+
+Functions:
+    publish: Writes an event in the current transaction.
+    relay_batch: Publishes one batch of due events.
+    drain: Publishes every due event in batches and returns the statistics.
+    lag_metrics: Returns the backlog of the outbox.
+    purge_published: Deletes the events published longer than ``OUTBOX_RETENTION`` ago.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from orders.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+class CeleryPublisher:
+    """
+    Sends each event as the Celery task routed to its topic, with the payload and ``event_id`` as keyword arguments.
+
+    Args:
+        routes (dict): The task name of each topic, ``OUTBOX_ROUTES`` by default.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = routes or settings.OUTBOX_ROUTES
+
+    def publish(self, event):
+        from config.celery import app
+
+        # No publish retries: the relay retries the event itself without holding its batch.
+        app.send_task(self.routes[event.topic], kwargs=dict(event.payload, event_id=event.id), retry=False)
+
+
+class InMemoryBroker:
+    """
+    Collects events in memory, a broker stand-in for tests.
+
+    Attributes:
+        messages: The ``(topic, kwargs)`` pairs published, repeats included.
+        failures: The number of next publishes to fail, simulating an unavailable broker.
+    """
+
+    def __init__(self, failures=0):
+        self.messages = []
+        self.failures = failures
+
+    def publish(self, event):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('in-memory broker unavailable')
+        self.messages.append((event.topic, dict(event.payload, event_id=event.id)))
+
+
+def publish(topic, payload):
+    """
+    Writes an event in the current transaction, to be relayed once it commits.
+
+    Args:
+        topic (str): The kind of event, a key of ``OUTBOX_ROUTES``.
+        payload (dict): The JSON-serialisable data of the event.
+
+    Returns:
+        OutboxEvent: The written event.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1), 60 * 60))
+
+
+def relay_batch(publisher, batch_size=None):
+    """
+    Publishes one batch of due events.
+
+    The batch is locked with ``SKIP LOCKED`` for the time it is published, so
+    concurrent relays share the backlog without publishing the same events.
+
+    Args:
+        publisher: The publisher of the events.
+        batch_size (int): The number of events per batch, ``OUTBOX_BATCH_SIZE`` by default.
+
+    Returns:
+        tuple: The events claimed, those published and the one that failed, if any.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    published, failed = [], []
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update(skip_locked=True)
+                      .filter(published_at__isnull=True, available_at__lte=now)
+                      .order_by('available_at', 'id')[:batch_size])
+        for event in events:
+            try:
+                publisher.publish(event)
+            except Exception as error:
+                event.attempts += 1
+                event.last_error = f'{type(error).__name__}: {error}'
+                event.available_at = timezone.now() + _backoff(event.attempts)
+                failed.append(event)
+                logger.warning('Could not publish outbox event %s (attempt %d): %s', event.id, event.attempts,
+                               event.last_error)
+                break
+            event.published_at = timezone.now()
+            published.append(event)
+        OutboxEvent.objects.bulk_update(published + failed,
+                                        ['attempts', 'last_error', 'available_at', 'published_at'])
+    return events, published, failed
+
+
+def drain(publisher=None, batch_size=None):
+    """
+    Publishes every due event in batches and returns the statistics.
+
+    Args:
+        publisher: The publisher of the events, a ``CeleryPublisher`` by default.
+        batch_size (int): The number of events per batch, ``OUTBOX_BATCH_SIZE`` by default.
+
+    Returns:
+        dict: The number of events published and failed, the number of batches and the
+        highest and mean seconds between writing and publishing an event.
+    """
+    publisher = publisher or CeleryPublisher()
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    stats = {'published': 0, 'failed': 0, 'batches': 0, 'max_lag': 0.0, 'mean_lag': 0.0}
+    total_lag = 0.0
+    while True:
+        events, published, failed = relay_batch(publisher, batch_size)
+        if not events:
+            break
+        stats['batches'] += 1
+        stats['published'] += len(published)
+        stats['failed'] += len(failed)
+        for event in published:
+            lag = (event.published_at - event.created_at).total_seconds()
+            stats['max_lag'] = max(stats['max_lag'], lag)
+            total_lag += lag
+        if failed or len(events) < batch_size:
+            break
+    if stats['published']:
+        stats['mean_lag'] = round(total_lag / stats['published'], 3)
+        stats['max_lag'] = round(stats['max_lag'], 3)
+        logger.info('Relayed outbox events: %s', stats)
+    return stats
+
+
+def lag_metrics(now=None):
+    """
+    Returns the backlog of the outbox.
+
+    Args:
+        now (datetime): The reference time, the current time by default.
+
+    Returns:
+        dict: The number of pending events, how many of them failed before, and the age
+        in seconds of the oldest one (0 when the outbox is empty).
+    """
+    backlog = OutboxEvent.objects.filter(published_at__isnull=True).aggregate(
+        pending=Count('id'), retrying=Count('id', filter=Q(attempts__gt=0)), oldest=Min('created_at'))
+    oldest = backlog.pop('oldest')
+    backlog['oldest_age'] = round(((now or timezone.now()) - oldest).total_seconds(), 3) if oldest else 0.0
+    return backlog
+
+
+def purge_published(batch_size=None, pause=None):
+    """
+    Deletes the events published longer than ``OUTBOX_RETENTION`` seconds ago, in chunks.
+
+    Args:
+        batch_size (int): The number of rows per DELETE, ``OUTBOX_BATCH_SIZE`` by default.
+        pause (float): The seconds to sleep between chunks.
+
+    Returns:
+        int: The number of deleted events.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=settings.OUTBOX_RETENTION)
+    deleted = 0
+    while True:
+        ids = list(OutboxEvent.objects.filter(published_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
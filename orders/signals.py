@@ -5,8 +5,8 @@ from django.dispatch import receiver  # Decorator for connecting receivers to si
 # Importing the Order model from the orders app
 from orders.models import Order  # Model representing an order
 
-# Importing the send_order_sms task from the current directory
-from .tasks import send_order_sms  # Task for sending order confirmation SMS
+# Importing the outbox from the current directory
+from . import outbox  # Events relayed to the consumers after commit
 
 # Define a receiver to handle post-save events on the Order model
 @receiver(post_save, sender=Order)
@@ -23,6 +23,7 @@ def order_created(sender, instance, created, **kwargs):
     Returns:
         None
     """
-    # If the instance is newly created, send an order confirmation SMS asynchronously
+    # If the instance is newly created, write its event in the same transaction; the outbox
+    # relay publishes it once committed, so placing an order never waits on the broker
     if created:
-        send_order_sms.delay(instance.id)
+        outbox.publish('order.created', {'order_id': instance.id})
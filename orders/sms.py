@@ -0,0 +1,292 @@
+"""
+Batched, rate-limited SMS dispatcher for order notifications.
+
+Notifications are queued as ``SmsMessage`` rows when the ``order.created`` event of
+the outbox is consumed, and a dispatch is scheduled once they commit. Dispatches coalesce: while one is
+scheduled, queuing more messages does not schedule another, so the messages placed
+within ``SMS_BATCH_WINDOW`` seconds are sent by one task. A dispatch claims due
+messages in batches of ``SMS_BATCH_SIZE`` with ``SKIP LOCKED``, sends them through one
+provider client per process at most ``SMS_RATE_LIMIT`` messages per second, and records
+the outcome of each one. Failed sends are retried with exponential backoff until
+``SMS_MAX_ATTEMPTS``; messages rejected by the provider fail at once.
+
+Classes:
+    PermanentError: Raised by providers when a message can never be delivered.
+    RateLimiter: Token bucket spacing the messages sent by a process.
+    KavenegarProvider: Sends messages through the Kavenegar verify lookup API.
+    FakeProvider: Records messages in memory, for tests and offline benchmarks.
+
+Functions:
+    get_provider: Returns the provider of the current process.
+    queue_order_sms: Queues the notification of a placed order.
+    schedule_dispatch: Schedules a dispatch unless one is already pending.
+    send_batch: Sends messages through a provider and records the outcome on them.
+    dispatch: Sends every due message in batches.
+"""
+
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from orders.models import SmsMessage
+
+DISPATCH_KEY = 'orders:sms-dispatch-scheduled'
+
+# Kavenegar statuses of a message that can never be sent: missing or invalid parameters,
+# an invalid receptor, an unknown template or invalid tokens
+REJECTED_STATUSES = frozenset({400, 406, 411, 413, 417, 419, 422, 424, 431, 432, 501})
+
+
+class PermanentError(Exception):
+    """Raised by providers when a message can never be delivered, so it is not retried."""
+
+
+class RateLimiter:
+    """
+    Token bucket spacing the messages sent by a process.
+
+    Args:
+        rate (float): The number of messages allowed per second.
+        burst (int): The number of messages that may be sent back to back.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a message may be sent."""
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+
+class KavenegarProvider:
+    """
+    Sends messages through the Kavenegar verify lookup API with one HTTP session per process.
+
+    The lookup is posted directly rather than through the ``kavenegar`` client, which
+    sends its requests without a timeout, so a stalled connection would hold the
+    dispatch and its claimed batch. Only the statuses in ``REJECTED_STATUSES`` fail a
+    message at once; throttling, credit and server errors are retried with backoff.
+    """
+
+    url = 'https://api.kavenegar.com/v1/{api_key}/verify/lookup.json'
+
+    def __init__(self):
+        import requests
+
+        self.session = requests.Session()
+        self.url = self.url.format(api_key=settings.KAVENEGAR_API_KEY)
+
+    def send(self, message):
+        """
+        Sends a message.
+
+        Args:
+            message (SmsMessage): The message to send.
+
+        Returns:
+            str: The id the provider gave the message.
+
+        Raises:
+            PermanentError: If the provider rejected the receptor or the parameters of the message.
+            ConnectionError: If the provider could not send it now.
+        """
+        response = self.session.post(self.url, data=dict(message.tokens, receptor=message.receptor,
+                                                         template=message.template),
+                                     timeout=settings.SMS_REQUEST_TIMEOUT)
+        try:
+            body = response.json()
+            status = body['return']['status']
+        except (ValueError, KeyError, TypeError) as error:
+            raise ConnectionError(f'Unreadable Kavenegar response (HTTP {response.status_code})') from error
+        if status != 200:
+            error = f"Kavenegar status {status}: {body['return'].get('message', '')}"
+            if status in REJECTED_STATUSES:
+                raise PermanentError(error)
+            raise ConnectionError(error)
+        entries = body.get('entries') or []
+        return str(entries[0].get('messageid', '')) if entries else ''
+
+
+class FakeProvider:
+    """
+    Records messages in memory instead of sending them, for tests and offline benchmarks.
+
+    Args:
+        latency (float): The seconds each send takes.
+        failure_rate (float): The share of sends failing with a retryable error.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+
+    def send(self, message):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError('fake provider failure')
+        self.sent.append(message)
+        return f'fake-{len(self.sent)}'
+
+
+_provider = None
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Returns the provider of the current process, built once from ``SMS_PROVIDER``.
+
+    Returns:
+        The provider instance.
+    """
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = import_string(settings.SMS_PROVIDER)()
+    return _provider
+
+
+def _get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter(settings.SMS_RATE_LIMIT)
+    return _limiter
+
+
+def queue_order_sms(order):
+    """
+    Queues the notification of a placed order and schedules a dispatch once the transaction commits.
+
+    Queuing the same order again returns its existing message, so a repeated
+    ``order.created`` event does not send a second notification.
+
+    Args:
+        order (Order): The placed order.
+
+    Returns:
+        SmsMessage: The queued message.
+    """
+    message, created = SmsMessage.objects.get_or_create(
+        order=order, template=settings.SMS_ORDER_TEMPLATE,
+        defaults={'receptor': order.phone, 'tokens': {'token': order.full_name(), 'token10': order.order_number}})
+    if created:
+        transaction.on_commit(schedule_dispatch)
+    return message
+
+
+def schedule_dispatch():
+    """Schedules a dispatch in ``SMS_BATCH_WINDOW`` seconds unless one is already pending."""
+    from config.celery import enqueue
+    from orders.tasks import dispatch_sms
+
+    window = settings.SMS_BATCH_WINDOW
+    if cache.add(DISPATCH_KEY, 1, timeout=window + settings.SMS_SEND_TIMEOUT):
+        try:
+            enqueue(dispatch_sms, countdown=window)
+        except Exception:
+            # The periodic dispatch picks the messages up if the broker is unavailable
+            cache.delete(DISPATCH_KEY)
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(settings.SMS_RETRY_BACKOFF * 2 ** (attempts - 1), 60 * 60))
+
+
+def send_batch(messages, provider, limiter=None):
+    """
+    Sends messages through a provider and records the outcome on them, without saving them.
+
+    Args:
+        messages (list): The SmsMessage objects to send.
+        provider: The provider sending them.
+        limiter (RateLimiter): The rate limiter to respect, or None to send as fast as the provider allows.
+
+    Returns:
+        dict: The number of messages sent, retried and failed.
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    for message in messages:
+        if limiter is not None:
+            limiter.acquire()
+        message.attempts += 1
+        try:
+            message.provider_id = provider.send(message)
+        except PermanentError as error:
+            message.status, message.last_error = SmsMessage.FAILED, str(error)
+        except Exception as error:
+            message.last_error = f'{type(error).__name__}: {error}'
+            if message.attempts >= settings.SMS_MAX_ATTEMPTS:
+                message.status = SmsMessage.FAILED
+            else:
+                message.status = SmsMessage.PENDING
+                message.next_attempt_at = timezone.now() + _backoff(message.attempts)
+                stats['retried'] += 1
+                continue
+        else:
+            message.status, message.sent_at, message.last_error = SmsMessage.SENT, timezone.now(), ''
+        stats['sent' if message.status == SmsMessage.SENT else 'failed'] += 1
+    return stats
+
+
+def _claim(batch_size):
+    """Marks a batch of due messages as being sent, so concurrent dispatches skip them."""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(SmsMessage.objects.select_for_update(skip_locked=True)
+                        .filter(status__in=[SmsMessage.PENDING, SmsMessage.SENDING], next_attempt_at__lte=now)
+                        .order_by('next_attempt_at', 'id')[:batch_size])
+        # A message left in SENDING by a crashed dispatch becomes due again after SMS_SEND_TIMEOUT
+        SmsMessage.objects.filter(id__in=[message.id for message in messages]).update(
+            status=SmsMessage.SENDING, next_attempt_at=now + timedelta(seconds=settings.SMS_SEND_TIMEOUT))
+    return messages
+
+
+def dispatch(batch_size=None):
+    """
+    Sends every due message in batches and records their delivery state.
+
+    Args:
+        batch_size (int): The number of messages claimed per batch, ``SMS_BATCH_SIZE`` by default.
+
+    Returns:
+        dict: The number of messages sent, retried and failed.
+    """
+    cache.delete(DISPATCH_KEY)
+    batch_size = batch_size or settings.SMS_BATCH_SIZE
+    provider, limiter = get_provider(), _get_limiter()
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        messages = _claim(batch_size)
+        if not messages:
+            return stats
+        for name, count in send_batch(messages, provider, limiter).items():
+            stats[name] += count
+        SmsMessage.objects.bulk_update(messages, ['status', 'attempts', 'next_attempt_at', 'last_error',
+                                                  'provider_id', 'sent_at'])
+        if len(messages) < batch_size:
+            return stats
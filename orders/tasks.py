@@ -1,23 +1,24 @@
 from celery import shared_task
-from kavenegar import KavenegarAPI
-from config import settings
+
+from orders import outbox, sms
 from orders.models import Order
 
 
 @shared_task
-def send_order_sms(order_id):
-    try:
-        order = Order.objects.get(id=order_id)
-        api = KavenegarAPI(settings.KAVENEGAR_API_KEY)
+def dispatch_sms(batch_size=None):
+    """Task sending the due order SMS in rate-limited batches, scheduled once messages are queued and every minute."""
+    return sms.dispatch(batch_size=batch_size)
+
 
-        params = {
-            'receptor': order.phone,
-            'token': order.full_name,
-            'token10': order.order_number,
-            'template': 'send-sms-for-create-order'
-        }
+@shared_task
+def order_created(order_id, event_id=None):
+    """Task consuming the order.created outbox event: queues the order confirmation SMS, once per order."""
+    order = Order.objects.filter(id=order_id).first()
+    if order is not None:
+        sms.queue_order_sms(order)
 
-        response = api.verify_lookup(params)
-        return response
-    except:
-        print("error")
+
+@shared_task
+def purge_outbox_events():
+    """Periodic task deleting the outbox events published longer than OUTBOX_RETENTION ago."""
+    return outbox.purge_published(pause=0.1)
@@ -1,3 +1,127 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from cart.models import CartItem
+from config.queries import query_budget
+from orders import outbox, sms
+from orders.models import Order, OutboxEvent, SmsMessage
+from orders.tasks import order_created
+from store.tests import create_product, create_user
+
+ORDER_FORM = {
+    'first_name': 'Ada', 'last_name': 'Byron', 'email': 'ada@example.com', 'phone': '09120000000',
+    'address_line_1': 'Main street', 'address_line_2': '', 'city': 'Tehran', 'state': 'Tehran',
+    'country': 'Iran', 'order_note': '',
+}
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """
+    Placing an order within its ``QUERY_BUDGETS`` entry.
+
+    The view opens its own transaction, so the test does not wrap it in one whose
+    savepoints would be counted as well.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.product = create_product()
+        self.user = create_user()
+        self.client.force_login(self.user)
+
+    def test_place_order(self):
+        for variation in ({'color': 'red'}, {'size': 'large'}):
+            self.client.post(reverse('add_cart', args=[self.product.id]), variation)
+        with query_budget('place_order'):
+            response = self.client.post(reverse('place_order'), ORDER_FORM)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+
+class OutboxTests(TestCase):
+    """The relay of the order events to an in-memory broker, through outages and repeated deliveries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def create_order(self):
+        return Order.objects.create(user=self.user, order_number=Order.objects.next_order_number(),
+                                    order_total=100, tax=9, ip='127.0.0.1', **ORDER_FORM)
+
+    def test_event_is_retried_after_an_outage(self):
+        orders = [self.create_order() for _ in range(3)]
+        events = list(OutboxEvent.objects.order_by('id'))
+        self.assertEqual([event.payload['order_id'] for event in events], [order.id for order in orders])
+        broker = outbox.InMemoryBroker(failures=1)
+
+        # The first publish fails: the batch stops and the event waits for its retry
+        stats = outbox.drain(broker, batch_size=2)
+        self.assertEqual((stats['published'], stats['failed']), (0, 1))
+        failed = OutboxEvent.objects.get(id=events[0].id)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('ConnectionError', failed.last_error)
+        self.assertGreater(failed.available_at, timezone.now())
+        self.assertIsNone(failed.published_at)
+
+        # Once the broker is back the other events are published, then the failed one when it is due
+        self.assertEqual(outbox.drain(broker, batch_size=2)['published'], 2)
+        OutboxEvent.objects.filter(id=failed.id).update(available_at=timezone.now())
+        self.assertEqual(outbox.drain(broker, batch_size=2)['published'], 1)
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+        self.assertEqual(sorted(kwargs['event_id'] for _, kwargs in broker.messages),
+                         [event.id for event in events])
+        self.assertEqual(outbox.lag_metrics()['pending'], 0)
+
+    def test_repeated_delivery_queues_one_sms(self):
+        order = self.create_order()
+        broker = outbox.InMemoryBroker()
+        outbox.drain(broker)
+        # A relay dying before marking the event published delivers it again
+        OutboxEvent.objects.update(published_at=None)
+        outbox.drain(broker)
+        self.assertEqual(len(broker.messages), 2)
+        self.assertEqual(broker.messages[0], broker.messages[1])
+
+        for topic, kwargs in broker.messages:
+            self.assertEqual(topic, 'order.created')
+            order_created(**kwargs)
+        self.assertEqual(SmsMessage.objects.filter(order=order).count(), 1)
+
+
+class KavenegarProviderTests(SimpleTestCase):
+    """The outcome of a send for each Kavenegar status, through a mocked HTTP session."""
+
+    def setUp(self):
+        self.provider = sms.KavenegarProvider()
+        self.message = SmsMessage(receptor='09120000000', template=settings.SMS_ORDER_TEMPLATE,
+                                  tokens={'token': 'Ada Byron', 'token10': '1'})
+
+    def send(self, status, entries=()):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'return': {'status': status, 'message': 'message'}, 'entries': list(entries)}
+        with mock.patch.object(self.provider.session, 'post', return_value=response) as post:
+            try:
+                return self.provider.send(self.message)
+            finally:
+                self.assertEqual(post.call_args.kwargs['timeout'], settings.SMS_REQUEST_TIMEOUT)
+                self.assertEqual(post.call_args.kwargs['data']['receptor'], '09120000000')
+
+    def test_sent(self):
+        self.assertEqual(self.send(200, [{'messageid': 8792343}]), '8792343')
+
+    def test_rejected_messages_fail_at_once(self):
+        for status in (411, 424, 431):
+            with self.subTest(status=status), self.assertRaises(sms.PermanentError):
+                self.send(status)
+
+    def test_throttling_credit_and_server_errors_are_retried(self):
+        for status in (409, 414, 418, 451, 500):
+            with self.subTest(status=status), self.assertRaises(ConnectionError):
+                self.send(status)
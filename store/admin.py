@@ -1,16 +1,109 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+
+from . import bulk
+from .forms import AvailabilityForm, ReassignForm, StockAdjustmentForm, VariationActivityForm
 from .models import Product, Variation, Price
 
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ('product_name', 'price', 'stock', 'modified_date', 'is_available', )
+
+class BulkActionMixin:
+    """
+    Admin mixin running bulk actions whose parameters are asked on an intermediate page.
+
+    The page posts the selection back to the change list with the action and an
+    ``apply`` flag, like the confirmation page of ``delete_selected``, so a selection
+    across every page is carried as the ``select_across`` flag instead of one id per row.
+    """
+
+    def run_bulk_action(self, request, queryset, form_class, change, title, action):
+        """
+        Asks the parameters of a bulk action, then applies it to the selected rows.
+
+        Args:
+            request: The HTTP request of the change list.
+            queryset (QuerySet): The selected rows.
+            form_class: The form asking the parameters, with a ``changes`` method.
+            change: Function of ``store.bulk`` applying the change to a queryset.
+            title (str): The title of the intermediate page.
+            action (str): The name of the admin action.
+
+        Returns:
+            TemplateResponse: The intermediate page, or None to go back to the change list.
+        """
+        form = form_class(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            updated = change(queryset, **form.changes())
+            self.message_user(request, f'{title}: {updated} {self.opts.verbose_name_plural} updated.')
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': self.opts,
+            'media': self.media + form.media,
+            'form': form,
+            'count': queryset.count(),
+            'action': action,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across') == '1',
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, 'admin/store/bulk_action.html', context)
+
+
+class ProductAdmin(BulkActionMixin, admin.ModelAdmin):
+    list_display = ('product_name', 'price', 'stock', 'category', 'gift', 'modified_date', 'is_available', )
+    list_filter = ('is_available', 'category', 'gift', )
+    list_select_related = ('price', 'category', 'gift', )
+    search_fields = ('product_name', 'artist', )
+    # The paginator counts the filtered rows only, not the whole table as well
+    show_full_result_count = False
+    actions = ('adjust_stock', 'set_availability', 'reassign', 'set_variations_active', )
+
+    @admin.action(description='Adjust the stock of the selected products', permissions=['change'])
+    def adjust_stock(self, request, queryset):
+        return self.run_bulk_action(request, queryset, StockAdjustmentForm, bulk.adjust_stock,
+                                    'Adjust stock', 'adjust_stock')
+
+    @admin.action(description='Make the selected products available or unavailable', permissions=['change'])
+    def set_availability(self, request, queryset):
+        return self.run_bulk_action(request, queryset, AvailabilityForm, bulk.set_availability,
+                                    'Change availability', 'set_availability')
+
+    @admin.action(description='Move the selected products to another category or gift', permissions=['change'])
+    def reassign(self, request, queryset):
+        return self.run_bulk_action(request, queryset, ReassignForm, bulk.reassign,
+                                    'Move to a category or gift', 'reassign')
+
+    @admin.action(description='Enable or disable the variations of the selected products', permissions=['change'])
+    def set_variations_active(self, request, queryset):
+        return self.run_bulk_action(request, queryset, VariationActivityForm, bulk.set_variations_active,
+                                    'Enable or disable variations', 'set_variations_active')
+
 
 class VariationAdmin(admin.ModelAdmin):
     list_display = ('product', 'variation_category', 'variation_value', 'is_active', 'created_date', )
     list_editable = ('is_active', )
+    list_filter = ('variation_category', 'is_active', )
+    list_select_related = ('product', )
+    show_full_result_count = False
+    actions = ('enable_variations', 'disable_variations', )
+
+    @admin.action(description='Enable the selected variations', permissions=['change'])
+    def enable_variations(self, request, queryset):
+        updated = bulk.set_variations_active(queryset, True)
+        self.message_user(request, f'{updated} variations enabled.')
+
+    @admin.action(description='Disable the selected variations', permissions=['change'])
+    def disable_variations(self, request, queryset):
+        updated = bulk.set_variations_active(queryset, False)
+        self.message_user(request, f'{updated} variations disabled.')
+
 
 class PricetAdmin(admin.ModelAdmin):
     ordering = ('price',)
 
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Variation, VariationAdmin)
-admin.site.register(Price, PricetAdmin)
\ No newline at end of file
+admin.site.register(Price, PricetAdmin)
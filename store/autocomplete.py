@@ -0,0 +1,189 @@
+"""
+In-process prefix index for search-box autocompletion.
+
+The index is a sorted array of ``<normalised text>\\0<product id>\\0<field>`` entries
+for every product name and artist, so a lookup is one binary search followed by a
+scan of the matching entries. It is built on first use, updated incrementally by
+the product receivers in ``store.signals``, and rebuilt when another process bumps
+the shared autocomplete version.
+
+Classes:
+    PrefixIndex: Sorted-array prefix index over product names and artists.
+
+Functions:
+    get_index: Returns the index of the current process, rebuilding it if it is stale.
+    product_changed: Updates the index after a product was saved.
+    product_removed: Updates the index after a product was deleted.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+
+from .search import normalize
+
+VERSION_KEY = 'store:autocomplete-version'
+
+NAME, ARTIST = 'n', 'a'
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over product names and artists.
+
+    Attributes:
+        entries: The sorted index entries.
+        labels: The display name and artist of every indexed product, by product id.
+    """
+
+    def __init__(self, rows=()):
+        """
+        Builds the index.
+
+        Args:
+            rows (iterable): ``(id, product_name, artist)`` tuples of the products to index.
+        """
+        self.labels = {}
+        entries = []
+        for product_id, name, artist in rows:
+            self.labels[product_id] = (name, artist)
+            entries.extend(self._entries(product_id, name, artist))
+        entries.sort()
+        self.entries = entries
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries(product_id, name, artist):
+        return [f'{normalize(name)}\0{product_id}\0{NAME}', f'{normalize(artist)}\0{product_id}\0{ARTIST}']
+
+    def add(self, product_id, name, artist):
+        """
+        Adds or replaces a product in the index.
+
+        Args:
+            product_id (int): The ID of the product.
+            name (str): The name of the product.
+            artist (str): The artist of the product.
+        """
+        with self._lock:
+            self._remove(product_id)
+            self.labels[product_id] = (name, artist)
+            for entry in self._entries(product_id, name, artist):
+                insort(self.entries, entry)
+
+    def remove(self, product_id):
+        """
+        Removes a product from the index.
+
+        Args:
+            product_id (int): The ID of the product.
+        """
+        with self._lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        labels = self.labels.pop(product_id, None)
+        if labels is None:
+            return
+        for entry in self._entries(product_id, *labels):
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def suggest(self, prefix, limit=10):
+        """
+        Returns the names and artists starting with a prefix.
+
+        Args:
+            prefix (str): The text typed by the visitor.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list: Distinct suggestions in alphabetical order of their normalised text.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        suggestions = []
+        entries = self.entries
+        position = bisect_left(entries, prefix)
+        while position < len(entries) and len(suggestions) < limit:
+            entry = entries[position]
+            if not entry.startswith(prefix):
+                break
+            _, product_id, field = entry.rsplit('\0', 2)
+            labels = self.labels.get(int(product_id))
+            if labels is not None:
+                label = labels[0] if field == NAME else labels[1]
+                if label not in suggestions:
+                    suggestions.append(label)
+            position += 1
+        return suggestions
+
+
+_index = None
+_version = None
+_build_lock = threading.Lock()
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_index():
+    """
+    Returns the index of the current process, rebuilding it if it is missing or stale.
+
+    Returns:
+        PrefixIndex: The prefix index.
+    """
+    global _index, _version
+    version = _shared_version()
+    if _index is None or _version != version:
+        with _build_lock:
+            if _index is None or _version != version:
+                from .models import Product
+
+                _index = PrefixIndex(Product.objects.values_list('id', 'product_name', 'artist').iterator())
+                _version = version
+    return _index
+
+
+def _bump():
+    """Bumps the shared version so the other processes rebuild, keeping this one current if it was."""
+    global _version
+    current = _version is not None and _version == cache.get(VERSION_KEY)
+    version = time.time_ns()
+    cache.set(VERSION_KEY, version, timeout=None)
+    if current:
+        _version = version
+
+
+def product_changed(product):
+    """
+    Updates the index after a product was saved.
+
+    Args:
+        product (Product): The saved product.
+    """
+    if _index is not None:
+        _index.add(product.pk, product.product_name, product.artist)
+    _bump()
+
+
+def product_removed(product_id):
+    """
+    Updates the index after a product was deleted.
+
+    Args:
+        product_id (int): The ID of the deleted product.
+    """
+    if _index is not None:
+        _index.remove(product_id)
+    _bump()
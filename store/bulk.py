@@ -0,0 +1,147 @@
+"""
+Set-based bulk changes of the catalogue, for the admin actions.
+
+Each change is an ``UPDATE`` of at most ``ADMIN_BULK_CHUNK_SIZE`` rows at a time, in
+primary key order, each chunk committed on its own, so a change of the whole catalogue
+neither locks every product at once nor holds up the cart's stock reservations.
+``QuerySet.update`` sends no ``post_save``, so the modification time of the changed
+products is set in the same ``UPDATE`` and the indexes maintained by
+``store.signals`` are invalidated once afterwards. The search and autocomplete
+documents do not cover the fields changed here.
+
+Functions:
+    update_in_chunks: Updates the rows of a queryset in chunks.
+    adjust_stock: Adds to, takes from or sets the stock of products.
+    set_availability: Makes products available or unavailable.
+    reassign: Moves products to another category or gift.
+    set_variations_active: Enables or disables variations.
+"""
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import facets, prices
+from .models import Product, Variation
+
+
+def update_in_chunks(queryset, chunk_size=None, on_chunk=None, **changes):
+    """
+    Updates the rows of a queryset in chunks of primary keys.
+
+    Args:
+        queryset (QuerySet): The rows to update.
+        chunk_size (int): The number of rows per UPDATE, ``ADMIN_BULK_CHUNK_SIZE`` by default.
+        on_chunk: Function called with the primary keys of each updated chunk.
+        **changes: The new values, as for ``QuerySet.update``.
+
+    Returns:
+        int: The number of updated rows.
+    """
+    chunk_size = chunk_size or settings.ADMIN_BULK_CHUNK_SIZE
+    model = queryset.model
+    keys = queryset.order_by('pk').values_list('pk', flat=True)
+    updated, last_pk = 0, None
+    while True:
+        ids = list((keys if last_pk is None else keys.filter(pk__gt=last_pk))[:chunk_size])
+        if not ids:
+            return updated
+        updated += model.objects.filter(pk__in=ids).update(**changes)
+        if on_chunk is not None:
+            on_chunk(ids)
+        if len(ids) < chunk_size:
+            return updated
+        last_pk = ids[-1]
+
+
+def adjust_stock(queryset, delta=None, value=None):
+    """
+    Adds to, takes from or sets the stock of products.
+
+    A relative change is applied to the current stock in the database, so the stock
+    reserved or returned by carts meanwhile is kept; stock never goes below zero.
+
+    Args:
+        queryset (QuerySet): The products.
+        delta (int): The units to add, negative to take units off.
+        value (int): The new stock, when ``delta`` is None.
+
+    Returns:
+        int: The number of updated products.
+    """
+    stock = Greatest(F('stock') + delta, 0) if delta is not None else value
+    return update_in_chunks(queryset, stock=stock, modified_date=timezone.now())
+
+
+def set_availability(queryset, available):
+    """
+    Makes products available or unavailable.
+
+    Args:
+        queryset (QuerySet): The products.
+        available (bool): The new availability.
+
+    Returns:
+        int: The number of updated products.
+    """
+    updated = update_in_chunks(queryset.exclude(is_available=available), is_available=available,
+                               modified_date=timezone.now())
+    if updated:
+        facets.invalidate()
+        prices.invalidate()
+    return updated
+
+
+def reassign(queryset, category=None, gift=None):
+    """
+    Moves products to another category or gift.
+
+    Args:
+        queryset (QuerySet): The products.
+        category (Category): The new category, None to keep it.
+        gift (GiftCategory): The new gift, None to keep it.
+
+    Returns:
+        int: The number of updated products.
+    """
+    changes = {}
+    if category is not None:
+        changes['category'] = category
+    if gift is not None:
+        changes['gift'] = gift
+    if not changes:
+        return 0
+    updated = update_in_chunks(queryset, modified_date=timezone.now(), **changes)
+    if updated:
+        facets.invalidate()
+    return updated
+
+
+def set_variations_active(queryset, active, variation_category=None):
+    """
+    Enables or disables variations, and touches their products.
+
+    Args:
+        queryset (QuerySet): The variations, or the products whose variations change.
+        active (bool): Whether the variations are offered.
+        variation_category (str): Only change the variations of this category, all by default.
+
+    Returns:
+        int: The number of updated variations.
+    """
+    if queryset.model is Product:
+        queryset = Variation.objects.filter(product__in=queryset.values('pk'))
+    if variation_category:
+        queryset = queryset.filter(variation_category=variation_category)
+    now = timezone.now()
+
+    def touch_products(ids):
+        Product.objects.filter(pk__in=Variation.objects.filter(pk__in=ids).values('product_id')).update(
+            modified_date=now)
+
+    updated = update_in_chunks(queryset.exclude(is_active=active), on_chunk=touch_products, is_active=active,
+                               modified_date=now)
+    if updated:
+        facets.invalidate()
+    return updated
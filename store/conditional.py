@@ -0,0 +1,95 @@
+"""
+Validators for conditional GETs of the catalogue pages.
+
+The listings only change when the shared facet version (products, variations and
+prices) or the menu version (categories and gifts) is bumped, and a product page only
+when its row does, so ``ETag`` and ``Last-Modified`` are computed from those versions
+without rendering. The header of every page greets the user and shows the cart badge,
+so the ETag also covers the visitor; ``Last-Modified`` cannot, and is only sent to
+anonymous visitors with an empty cart. Pages carrying flash messages are never
+answered with a 304.
+
+Functions:
+    catalogue_version: Returns the combined facet and menu version.
+    listing_etag: ETag of a store, category or gift listing.
+    listing_last_modified: Last-Modified of a listing for anonymous visitors with an empty cart.
+    product_etag: ETag of a product page.
+"""
+
+import datetime
+import hashlib
+
+from django.contrib.messages import get_messages
+
+from cart.context_processors import cart_count
+from category.menu import menu_version
+
+from . import facets
+from .models import Product
+
+
+def catalogue_version():
+    """
+    Returns the combined facet and menu version.
+
+    Returns:
+        tuple: The facet version and the menu version.
+    """
+    return facets.version(), menu_version()
+
+
+def _etag(request, *parts):
+    if len(get_messages(request)):
+        return None
+    user = request.user
+    visitor = (user.pk, user.first_name) if user.is_authenticated else None
+    digest = hashlib.md5(repr((parts, visitor, cart_count(request))).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def listing_etag(request, *args, **kwargs):
+    """
+    ETag of a store, category or gift listing.
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        str: A weak ETag, or None when the page carries flash messages.
+    """
+    return _etag(request, catalogue_version())
+
+
+def listing_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified of a listing for anonymous visitors with an empty cart.
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        datetime: The time of the latest catalogue change, or None for any other visitor.
+    """
+    if request.user.is_authenticated or cart_count(request) or len(get_messages(request)):
+        return None
+    return datetime.datetime.fromtimestamp(max(catalogue_version()) / 1e9, tz=datetime.timezone.utc)
+
+
+def product_etag(request, category_slug, product_slug):
+    """
+    ETag of a product page, from the product's modification time and stock state.
+
+    Args:
+        request: The HTTP request.
+        category_slug: The slug of the product's category.
+        product_slug: The slug of the product.
+
+    Returns:
+        str: A weak ETag, or None when the product does not exist or the page carries flash messages.
+    """
+    row = (Product.objects.filter(category__slug=category_slug, slug=product_slug)
+           .values_list('modified_date', 'stock').first())
+    if row is None:
+        return None
+    modified_date, stock = row
+    return _etag(request, modified_date, stock > 0, menu_version())
@@ -0,0 +1,375 @@
+"""
+In-memory filter and facet engine for store listings.
+
+Every process keeps one bitset per category, gift, variation value and price over
+the ids of the available products, using Python integers as bitsets (bit ``n`` is
+product ``n``). Any combination of filters is answered with bitwise ANDs, and the
+count of every facet value is a popcount of that value's bitset against the other
+filters, so a listing needs no ``GROUP BY`` and returns only ids for hydration.
+
+The index is built on first use and updated incrementally by the receivers in
+``store.signals``. Each change bumps the shared facet version and is logged with the
+changed product id, so the other processes replay the last ``STORE_FACET_CHANGES``
+changes instead of rebuilding; they only rebuild when the log does not cover their
+version, or past a change that may touch every product, like a price edit.
+
+Classes:
+    FacetResult: The matching product ids and the facet counts of a query.
+    FacetIndex: The bitsets of the available products.
+
+Functions:
+    get_index: Returns the index of the current process, rebuilding it if it is stale.
+    aget_index: Async get_index, rebuilding in the sync thread.
+    product_changed: Updates the index after a product or its variations changed.
+    invalidate: Makes every process rebuild its index.
+    version: Returns the shared facet version.
+    aversion: Async version.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .search import normalize
+
+VERSION_KEY = 'store:facets-version'
+CHANGES_KEY = 'store:facets-changes'
+LOCK_KEY = 'store:facets-changes-lock'
+
+
+class FacetResult:
+    """
+    The matching product ids and the facet counts of a query.
+
+    Attributes:
+        bits: The bitset of the matching product ids.
+        count: The number of matching products.
+        categories: The number of products per category id.
+        gifts: The number of products per gift id.
+        variations: The number of products per ``(variation category, value)``.
+        prices: The number of products per price.
+    """
+
+    def __init__(self, bits, categories, gifts, variations, prices):
+        self.bits = bits
+        self.count = bits.bit_count()
+        self.categories = categories
+        self.gifts = gifts
+        self.variations = variations
+        self.prices = prices
+
+
+class FacetIndex:
+    """
+    The bitsets of the available products.
+
+    Attributes:
+        universe: The bitset of every indexed product.
+        categories: The bitset of each category id.
+        gifts: The bitset of each gift id.
+        variations: The bitset of each ``(variation category, normalised value)``.
+        prices: The bitset of each price.
+    """
+
+    def __init__(self, products=(), variations=()):
+        """
+        Builds the index.
+
+        Args:
+            products (iterable): ``(id, category_id, gift_id, price)`` tuples of the available products.
+            variations (iterable): ``(product_id, variation_category, variation_value)`` tuples of their
+                active variations.
+        """
+        self.universe = 0
+        self.categories = defaultdict(int)
+        self.gifts = defaultdict(int)
+        self.variations = defaultdict(int)
+        self.prices = defaultdict(int)
+        self._products = {}
+        self._lock = threading.Lock()
+        keys = defaultdict(set)
+        for product_id, variation_category, variation_value in variations:
+            keys[product_id].add((variation_category, normalize(variation_value)))
+        for product_id, category_id, gift_id, price in products:
+            self._add(product_id, category_id, gift_id, price, keys.get(product_id, ()))
+
+    def _add(self, product_id, category_id, gift_id, price, variation_keys):
+        bit = 1 << product_id
+        self.universe |= bit
+        self.categories[category_id] |= bit
+        self.gifts[gift_id] |= bit
+        self.prices[price] |= bit
+        for key in variation_keys:
+            self.variations[key] |= bit
+        self._products[product_id] = (category_id, gift_id, price, frozenset(variation_keys))
+
+    def _remove(self, product_id):
+        attributes = self._products.pop(product_id, None)
+        if attributes is None:
+            return
+        category_id, gift_id, price, variation_keys = attributes
+        mask = ~(1 << product_id)
+        self.universe &= mask
+        for bitsets, key in [(self.categories, category_id), (self.gifts, gift_id), (self.prices, price),
+                             *((self.variations, variation_key) for variation_key in variation_keys)]:
+            bitsets[key] &= mask
+            if not bitsets[key]:
+                del bitsets[key]
+
+    def update(self, product_id, attributes):
+        """
+        Replaces or removes a product in the index.
+
+        Args:
+            product_id (int): The ID of the product.
+            attributes (tuple): ``(category_id, gift_id, price, variation_keys)`` of the product, or None
+                if it was deleted or is no longer available.
+        """
+        with self._lock:
+            self._remove(product_id)
+            if attributes is not None:
+                self._add(product_id, *attributes)
+
+    def query(self, category=None, gift=None, variations=None, price_range=None):
+        """
+        Returns the products matching the filters and the count of every facet value.
+
+        The count of a facet value applies every filter except the one on its own facet,
+        so the alternatives to a selected value keep their counts.
+
+        Args:
+            category (int): The category id to filter by.
+            gift (int): The gift id to filter by.
+            variations (dict): Variation values to filter by per variation category; values of one
+                category are ORed, categories are ANDed.
+            price_range (tuple): The inclusive ``(min, max)`` price range.
+
+        Returns:
+            FacetResult: The matching ids and the facet counts.
+        """
+        # Receivers update the index from other threads; they must not change it mid-query
+        with self._lock:
+            filters = {}
+            if category is not None:
+                filters['category'] = self.categories.get(category, 0)
+            if gift is not None:
+                filters['gift'] = self.gifts.get(gift, 0)
+            for variation_category, values in (variations or {}).items():
+                bits = 0
+                for value in values:
+                    bits |= self.variations.get((variation_category, normalize(value)), 0)
+                filters[f'variation:{variation_category}'] = bits
+            if price_range is not None:
+                low, high = price_range
+                bits = 0
+                for price, price_bits in self.prices.items():
+                    if low <= price <= high:
+                        bits |= price_bits
+                filters['price'] = bits
+
+            combined = {}
+
+            def matching(exclude=None):
+                if exclude not in combined:
+                    bits = self.universe
+                    for name, filter_bits in filters.items():
+                        if name != exclude:
+                            bits &= filter_bits
+                    combined[exclude] = bits
+                return combined[exclude]
+
+            def counts(bitsets, facet):
+                base = matching(facet)
+                return {key: (base & bits).bit_count() for key, bits in bitsets.items()}
+
+            return FacetResult(
+                matching(),
+                counts(self.categories, 'category'),
+                counts(self.gifts, 'gift'),
+                {key: (matching(f'variation:{key[0]}') & bits).bit_count() for key, bits in self.variations.items()},
+                counts(self.prices, 'price'),
+            )
+
+
+_index = None
+_version = None
+_build_lock = threading.Lock()
+
+
+def version():
+    """
+    Returns the shared facet version, initialising it if the cache lost it.
+
+    The version changes whenever an available product, its variations or a price
+    changes, so it also serves as a validator of the catalogue listings.
+
+    Returns:
+        int: The facet version, a ``time.time_ns()`` timestamp.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aversion():
+    """Async ``version``, reading the shared cache without blocking the event loop."""
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def _bump(product_id):
+    """
+    Bumps the shared version and logs the changed product for the other processes to replay.
+
+    Each entry links the version it follows, so a bump missing from the log, like an
+    invalidation or a bump that could not take the lock of the log, breaks the chain
+    and makes the other processes rebuild instead of replaying past it.
+
+    Args:
+        product_id (int): The ID of the changed product, or None when every product may have changed.
+    """
+    global _version
+    locked = _lock_changes()
+    try:
+        previous = cache.get(VERSION_KEY)
+        bumped = max(time.time_ns(), (previous or 0) + 1)
+        if locked and product_id is not None:
+            log = [*(cache.get(CHANGES_KEY) or []), (previous, bumped, product_id)]
+            cache.set(CHANGES_KEY, log[-settings.STORE_FACET_CHANGES:], timeout=None)
+        cache.set(VERSION_KEY, bumped, timeout=None)
+    finally:
+        if locked:
+            cache.delete(LOCK_KEY)
+    # The caller applied its change to this process's index, which stays current if it was
+    if product_id is not None and _version is not None and _version == previous:
+        _version = bumped
+
+
+def _lock_changes():
+    """Takes the lock of the change log, waiting at most a second for it."""
+    deadline = time.monotonic() + 1
+    while not cache.add(LOCK_KEY, 1, timeout=5):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _attributes(product_ids):
+    """
+    Returns the indexed attributes of products.
+
+    Args:
+        product_ids (iterable): The IDs of the products.
+
+    Returns:
+        dict: ``(category_id, gift_id, price, variation_keys)`` per product id, None for the
+        products deleted or no longer available.
+    """
+    from .models import Product, Variation
+
+    attributes = dict.fromkeys(product_ids)
+    variation_keys = defaultdict(set)
+    for product_id, variation_category, variation_value in Variation.objects.filter(
+            product_id__in=attributes, is_active=True).values_list('product_id', 'variation_category',
+                                                                   'variation_value'):
+        variation_keys[product_id].add((variation_category, normalize(variation_value)))
+    for product_id, *row in Product.objects.filter(pk__in=attributes, is_available=True).values_list(
+            'id', 'category_id', 'gift_id', 'unit_price'):
+        attributes[product_id] = (*row, variation_keys[product_id])
+    return attributes
+
+
+def _replay(current):
+    """
+    Applies the changes logged since the index's version, when the log covers all of them.
+
+    Args:
+        current (int): The shared facet version.
+
+    Returns:
+        bool: Whether the index reached ``current``; if not it has to be rebuilt.
+    """
+    product_ids, reached = set(), _version
+    for previous, version, product_id in cache.get(CHANGES_KEY) or []:
+        if version <= reached:
+            continue
+        if previous != reached:
+            return False
+        product_ids.add(product_id)
+        reached = version
+        if reached == current:
+            for product_id, attributes in _attributes(product_ids).items():
+                _index.update(product_id, attributes)
+            return True
+    return False
+
+
+def get_index():
+    """
+    Returns the index of the current process, catching up with the other processes' changes.
+
+    A stale index replays the products changed since its version from the shared change
+    log, and is only rebuilt when the log no longer covers them.
+
+    Returns:
+        FacetIndex: The facet index.
+    """
+    global _index, _version
+    current = version()
+    if _index is None or _version != current:
+        with _build_lock:
+            if _index is None or _version != current:
+                if _index is None or not _replay(current):
+                    from .models import Product, Variation
+
+                    _index = FacetIndex(
+                        Product.objects.filter(is_available=True)
+                        .values_list('id', 'category_id', 'gift_id', 'unit_price').iterator(),
+                        Variation.objects.filter(is_active=True, product__is_available=True)
+                        .values_list('product_id', 'variation_category', 'variation_value').iterator(),
+                    )
+                _version = current
+    return _index
+
+
+async def aget_index():
+    """
+    Async ``get_index``, catching up or rebuilding a missing or stale index in the sync thread.
+
+    Returns:
+        FacetIndex: The facet index.
+    """
+    if _index is not None and _version == await aversion():
+        return _index
+    return await sync_to_async(get_index)()
+
+
+def product_changed(product_id):
+    """
+    Updates the index after a product or its variations changed, once the transaction commits.
+
+    Args:
+        product_id (int): The ID of the product.
+    """
+    def apply():
+        if _index is not None:
+            _index.update(product_id, _attributes([product_id])[product_id])
+        _bump(product_id)
+
+    transaction.on_commit(apply)
+
+
+def invalidate():
+    """Makes every process rebuild its index once the transaction commits."""
+    transaction.on_commit(lambda: _bump(None))
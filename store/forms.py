@@ -0,0 +1,105 @@
+"""
+Forms of the bulk catalogue actions of the admin.
+
+Classes:
+    StockAdjustmentForm: Adds to, takes from or sets the stock of products.
+    AvailabilityForm: Makes products available or unavailable.
+    ReassignForm: Moves products to another category or gift.
+    VariationActivityForm: Enables or disables the variations of products.
+"""
+
+from django import forms
+
+from category.models import Category, GiftCategory
+
+from .models import variation_category_choice
+
+AVAILABILITY_CHOICES = (('1', 'Available'), ('0', 'Unavailable'))
+ACTIVITY_CHOICES = (('1', 'Enabled'), ('0', 'Disabled'))
+
+
+class StockAdjustmentForm(forms.Form):
+    """
+    Form adding to, taking from or setting the stock of products.
+
+    Attributes:
+        mode (ChoiceField): Whether the quantity is added, taken off or the new stock.
+        quantity (IntegerField): The number of units.
+    """
+
+    mode = forms.ChoiceField(choices=(('add', 'Add units'), ('remove', 'Take units off'), ('set', 'Set the stock to')))
+    quantity = forms.IntegerField(min_value=0)
+
+    def changes(self):
+        """Returns the keyword arguments of ``store.bulk.adjust_stock``."""
+        mode, quantity = self.cleaned_data['mode'], self.cleaned_data['quantity']
+        if mode == 'set':
+            return {'value': quantity}
+        return {'delta': quantity if mode == 'add' else -quantity}
+
+
+class AvailabilityForm(forms.Form):
+    """
+    Form making products available or unavailable.
+
+    Attributes:
+        is_available (TypedChoiceField): The new availability.
+    """
+
+    is_available = forms.TypedChoiceField(choices=AVAILABILITY_CHOICES, coerce=lambda value: value == '1',
+                                          label='Availability')
+
+    def changes(self):
+        """Returns the keyword arguments of ``store.bulk.set_availability``."""
+        return {'available': self.cleaned_data['is_available']}
+
+
+class ReassignForm(forms.Form):
+    """
+    Form moving products to another category or gift.
+
+    Attributes:
+        category (ModelChoiceField): The new category, blank to keep it.
+        gift (ModelChoiceField): The new gift, blank to keep it.
+    """
+
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), required=False,
+                                      help_text='Leave blank to keep the current category.')
+    gift = forms.ModelChoiceField(queryset=GiftCategory.objects.all(), required=False,
+                                  help_text='Leave blank to keep the current gift.')
+
+    def clean(self):
+        """
+        Validates the form data.
+
+        Raises:
+            forms.ValidationError: If neither a category nor a gift is chosen.
+        """
+        cleaned_data = super().clean()
+        if not cleaned_data.get('category') and not cleaned_data.get('gift'):
+            raise forms.ValidationError('Choose a category, a gift or both.')
+        return cleaned_data
+
+    def changes(self):
+        """Returns the keyword arguments of ``store.bulk.reassign``."""
+        return {'category': self.cleaned_data['category'], 'gift': self.cleaned_data['gift']}
+
+
+class VariationActivityForm(forms.Form):
+    """
+    Form enabling or disabling the variations of products.
+
+    Attributes:
+        is_active (TypedChoiceField): Whether the variations are offered.
+        variation_category (ChoiceField): The kind of variations to change, blank for all.
+    """
+
+    is_active = forms.TypedChoiceField(choices=ACTIVITY_CHOICES, coerce=lambda value: value == '1',
+                                       label='Variations')
+    variation_category = forms.ChoiceField(choices=(('', 'All'), *variation_category_choice), required=False,
+                                           label='Kind')
+
+    def changes(self):
+        """Returns the keyword arguments of ``store.bulk.set_variations_active``."""
+        return {'active': self.cleaned_data['is_active'],
+                'variation_category': self.cleaned_data['variation_category'] or None}
@@ -0,0 +1,239 @@
+"""
+Image derivative pipeline for product and category images.
+
+Every uploaded image gets resized derivatives, one per width of
+``IMAGE_DERIVATIVE_WIDTHS`` narrower than the original, each in the original's
+format (JPEG, or PNG for images with transparency) and in WebP. They are rendered by
+Pillow in a process pool by the ``generate_image_derivatives`` task scheduled when a
+row's image changes, stored through the content-addressed storage under
+``derivatives/`` and recorded on the row, in the ``<field>_derivatives`` JSON column
+next to the image field::
+
+    {'source': 'photos/products/ab/ab12....jpg', 'width': 1600, 'height': 1200,
+     'sizes': {'thumb': {'width': 240, 'height': 180, 'jpeg': 'derivatives/...jpg', 'webp': '...'}, ...}}
+
+Functions:
+    render_derivatives: Renders the derivatives of an image, in a pool worker.
+    render_many: Renders the derivatives of several images in the process pool.
+    generate: Generates and records the derivatives of a row's image.
+    schedule: Schedules the derivatives of a row's image once the transaction commits.
+    derivatives: Returns the recorded derivatives of a stored image.
+    srcset: Returns the srcset of a stored image in a format.
+"""
+
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from category.menu import bump_menu_version
+from category.models import Category, GiftCategory
+from config.celery import enqueue
+from config.storage import content_storage
+
+from . import facets
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIRECTORY = 'derivatives'
+
+_pool = None
+
+
+def render_derivatives(data, widths, quality):
+    """
+    Renders the derivatives of an image, in a pool worker.
+
+    Args:
+        data (bytes): The content of the original image.
+        widths (dict): The target width of each size name.
+        quality (int): The JPEG and WebP quality.
+
+    Returns:
+        dict: The ``width`` and ``height`` of the original and its ``derivatives`` as
+        ``(size, format, width, height, bytes)`` tuples, none for the widths the original does not exceed.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+        formats = (('png', {'optimize': True}) if transparent else
+                   ('jpeg', {'quality': quality, 'optimize': True, 'progressive': True}),
+                   ('webp', {'quality': quality, 'method': 6}))
+        rendered = []
+        for size, width in sorted(widths.items(), key=lambda item: item[1]):
+            if width >= image.width:
+                continue
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for fmt, options in formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt.upper(), **options)
+                rendered.append((size, fmt, resized.width, resized.height, buffer.getvalue()))
+    return {'width': image.width, 'height': image.height, 'derivatives': rendered}
+
+
+def _get_pool():
+    """Returns the process pool, or None where this process may not have children, as in a Celery prefork worker."""
+    global _pool
+    if _pool is None:
+        if multiprocessing.current_process().daemon:
+            return None
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS)
+    return _pool
+
+
+def render_many(images):
+    """
+    Renders the derivatives of several images in the process pool.
+
+    Args:
+        images (list): The contents of the original images.
+
+    Returns:
+        list: The result of ``render_derivatives`` for each image, or the exception it raised.
+    """
+    arguments = (settings.IMAGE_DERIVATIVE_WIDTHS, settings.IMAGE_DERIVATIVE_QUALITY)
+    pool = _get_pool()
+    if pool is None:
+        futures = None
+    else:
+        futures = [pool.submit(render_derivatives, data, *arguments) for data in images]
+    results = []
+    for position, data in enumerate(images):
+        try:
+            if futures is None:
+                results.append(render_derivatives(data, *arguments))
+            else:
+                results.append(futures[position].result())
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+def _store(source, rendered):
+    """Stores rendered derivatives and returns the value of the ``<field>_derivatives`` column."""
+    storage = content_storage()
+    sizes = {}
+    for size, fmt, width, height, data in rendered['derivatives']:
+        entry = sizes.setdefault(size, {'width': width, 'height': height})
+        entry[fmt] = storage.save(f"{DERIVATIVES_DIRECTORY}/{size}.{'jpg' if fmt == 'jpeg' else fmt}",
+                                  ContentFile(data))
+    return {'source': source, 'width': rendered['width'], 'height': rendered['height'], 'sizes': sizes}
+
+
+def generate(rows):
+    """
+    Generates and records the derivatives of rows' images.
+
+    A row whose image changed meanwhile is left for the task its change scheduled.
+
+    Args:
+        rows (list): ``(model_label, pk, field_name)`` tuples.
+
+    Returns:
+        int: The number of rows whose derivatives were recorded.
+    """
+    jobs = []
+    for model_label, pk, field_name in rows:
+        model = apps.get_model(model_label)
+        source = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+        if not source:
+            continue
+        try:
+            with content_storage().open(source) as file:
+                jobs.append((model, pk, field_name, source, file.read()))
+        except OSError:
+            logger.warning('Image %s of %s %s is missing.', source, model_label, pk)
+    recorded, changed_models = 0, set()
+    for (model, pk, field_name, source, _), rendered in zip(jobs, render_many([job[4] for job in jobs])):
+        if isinstance(rendered, Exception):
+            logger.warning('Could not render the derivatives of %s: %s', source, rendered)
+            continue
+        changes = {f'{field_name}_derivatives': _store(source, rendered)}
+        if hasattr(model, 'modified_date'):
+            # A new modification time refreshes the product page ETag and cached fragments
+            changes['modified_date'] = timezone.now()
+        if model.objects.filter(pk=pk, **{field_name: source}).update(**changes):
+            recorded += 1
+            changed_models.add(model)
+    # The listings are validated by the facet and menu versions, and the menus keep their rows in memory
+    if Product in changed_models:
+        facets.invalidate()
+    if changed_models & {Category, GiftCategory}:
+        bump_menu_version()
+    return recorded
+
+
+def schedule(instance, field_name):
+    """
+    Schedules the derivatives of a row's image once the transaction commits, if the image changed.
+
+    Args:
+        instance: The saved row.
+        field_name (str): The name of the image field.
+    """
+    source = getattr(instance, field_name).name
+    if not source or getattr(instance, f'{field_name}_derivatives', {}).get('source') == source:
+        return
+    from store.tasks import generate_image_derivatives
+
+    row = (instance._meta.label, instance.pk, field_name)
+
+    def send():
+        try:
+            enqueue(generate_image_derivatives, row)
+        except Exception as error:
+            logger.warning('Could not schedule the derivatives of %s, run backfill_image_derivatives: %s', source,
+                           error)
+
+    transaction.on_commit(send)
+
+
+def derivatives(fieldfile):
+    """
+    Returns the recorded derivatives of a stored image.
+
+    Args:
+        fieldfile: The ImageFieldFile of a row with a ``<field>_derivatives`` column.
+
+    Returns:
+        dict: The ``<field>_derivatives`` value, or None if the current image has none yet.
+    """
+    recorded = getattr(fieldfile.instance, f'{fieldfile.field.name}_derivatives', None) or {}
+    return recorded if fieldfile and recorded.get('source') == fieldfile.name else None
+
+
+def srcset(fieldfile, fmt=None):
+    """
+    Returns the srcset of a stored image in a format.
+
+    Args:
+        fieldfile: The ImageFieldFile of a row with a ``<field>_derivatives`` column.
+        fmt (str): 'webp', or None for the original's format.
+
+    Returns:
+        str: The ``url width`` candidates, the original included when ``fmt`` is None; empty if
+        there are no derivatives of the current image.
+    """
+    recorded = derivatives(fieldfile)
+    if recorded is None:
+        return ''
+    storage = content_storage()
+    candidates = []
+    for entry in recorded['sizes'].values():
+        name = entry.get(fmt) if fmt else entry.get('jpeg', entry.get('png'))
+        if name:
+            candidates.append((entry['width'], storage.url(name)))
+    if fmt is None:
+        candidates.append((recorded['width'], fieldfile.url))
+    candidates.sort()
+    return ', '.join(f'{url} {width}w' for width, url in candidates)
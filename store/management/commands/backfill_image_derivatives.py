@@ -0,0 +1,72 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from config.storage import content_storage, is_content_addressed
+from store import images
+from store.signals import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    """
+    Management command generating the derivatives of the images uploaded before the
+    pipeline, or whose task was lost.
+
+    Rows are read in primary key order, ``--batch-size`` at a time, and the images of a
+    batch rendered together in the process pool. With ``--rehash`` the originals stored
+    under their upload name are first copied under their content hash so they get
+    immutable cache headers; the old files are left in place for the pages still cached
+    with their URL.
+    """
+    help = 'Generates the missing resized and WebP derivatives of product and category images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Number of images rendered together.')
+        parser.add_argument('--force', action='store_true', help='Regenerate the derivatives that already exist.')
+        parser.add_argument('--rehash', action='store_true',
+                            help='Store the originals not yet under their content hash there first.')
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS.items():
+            rehashed = self.rehash(model, field_name) if options['rehash'] else 0
+            pending = recorded = 0
+            for rows in self.batches(model, field_name, options['batch_size'], options['force']):
+                pending += len(rows)
+                recorded += images.generate(rows)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label}.{field_name}: rehashed {rehashed} originals, '
+                f'recorded derivatives of {recorded} of {pending} images.'))
+
+    @staticmethod
+    def batches(model, field_name, batch_size, force):
+        """Yields the ``(model_label, pk, field_name)`` rows whose image lacks derivatives, a batch at a time."""
+        column = f'{field_name}_derivatives'
+        last_pk = 0
+        while True:
+            page = list(model.objects.filter(pk__gt=last_pk).exclude(**{field_name: ''}).order_by('pk')
+                        .values_list('pk', field_name, column)[:batch_size])
+            if not page:
+                return
+            last_pk = page[-1][0]
+            rows = [(model._meta.label, pk, field_name) for pk, source, recorded in page
+                    if force or (recorded or {}).get('source') != source]
+            if rows:
+                yield rows
+
+    @staticmethod
+    def rehash(model, field_name):
+        """Stores the originals not yet under their content hash there and points their rows at the copy."""
+        storage = content_storage()
+        rehashed = 0
+        for pk, source in model.objects.exclude(**{field_name: ''}).values_list('pk', field_name).iterator():
+            if is_content_addressed(source) or not storage.exists(source):
+                continue
+            with storage.open(source) as file:
+                name = storage.save(os.path.join(model._meta.get_field(field_name).upload_to, os.path.basename(source)),
+                                    file)
+            changes = {field_name: name}
+            if hasattr(model, 'modified_date'):
+                changes['modified_date'] = timezone.now()
+            rehashed += model.objects.filter(pk=pk, **{field_name: source}).update(**changes)
+        return rehashed
@@ -0,0 +1,88 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from store.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Management command comparing the catalogue and cart pages served by the ASGI and
+    WSGI handlers at a given concurrency.
+
+    The WSGI stack is driven by as many threads as concurrent requests, like a threaded
+    WSGI server, and the ASGI stack by as many concurrent tasks on a single event loop,
+    like an ASGI server with one worker. Both run in this process through Django's test
+    clients against the configured database, so the figures compare the handlers and
+    views rather than the network.
+    """
+    help = 'Benchmarks requests/sec and latency percentiles of the storefront pages under ASGI and WSGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Number of requests per stack.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Number of requests in flight.')
+        parser.add_argument('--host', help='Host the requests are addressed to, the first of ALLOWED_HOSTS by default.')
+        parser.add_argument('--stack', choices=['asgi', 'wsgi'], action='append',
+                            help='Stack to benchmark, both by default.')
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(is_available=True).select_related('category').order_by('id').first()
+        if product is None:
+            raise CommandError('The catalogue has no available product to request.')
+        paths = [reverse('store'), product.get_url(),
+                 f"{reverse('search')}?keyword={product.product_name.split()[0]}", reverse('cart')]
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+        host = options['host'] or (hosts[0] if hosts else 'localhost')
+        requests = [paths[number % len(paths)] for number in range(options['requests'])]
+
+        for stack in options['stack'] or ['wsgi', 'asgi']:
+            run = self.run_asgi if stack == 'asgi' else self.run_wsgi
+            # A first pass warms the per-process caches so both stacks are measured warm
+            run(paths, options['concurrency'], host)
+            seconds, latencies, errors = run(requests, options['concurrency'], host)
+            self.report(stack, seconds, latencies, errors)
+
+    def run_wsgi(self, requests, concurrency, host):
+        def fetch(path):
+            started = time.perf_counter()
+            response = Client(SERVER_NAME=host).get(path)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, requests))
+        return self.summarise(time.perf_counter() - started, results)
+
+    def run_asgi(self, requests, concurrency, host):
+        async def fetch(client, slots, path):
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(path)
+                return time.perf_counter() - started, response.status_code
+
+        async def main():
+            client, slots = AsyncClient(server=(host, '80')), asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(fetch(client, slots, path) for path in requests))
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        return self.summarise(time.perf_counter() - started, results)
+
+    @staticmethod
+    def summarise(seconds, results):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status >= 400)
+        return seconds, latencies, errors
+
+    def report(self, stack, seconds, latencies, errors):
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(self.style.SUCCESS(
+            f"{stack.upper()}: {len(latencies) / seconds:.1f} requests/s, "
+            f"p50 {percentiles[49] * 1000:.1f}ms, p99 {percentiles[98] * 1000:.1f}ms, "
+            f"{errors} errors over {len(latencies)} requests."))
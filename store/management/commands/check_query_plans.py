@@ -0,0 +1,109 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from account.models import Account
+from cart.models import Cart, CartItem
+from category.models import Category, GiftCategory
+from orders.models import Order
+from store.models import Price, Product, Variation
+
+# Plan lines reporting a full table scan, per database vendor
+SEQUENTIAL_SCANS = {
+    'postgresql': ('EXPLAIN ', re.compile(r'Seq Scan on (\w+)')),
+    'sqlite': ('EXPLAIN QUERY PLAN ', re.compile(r'^SCAN (\w+)$')),
+}
+
+
+def hot_queries(sample):
+    """
+    Returns the queries run on every storefront request, built against seeded rows.
+
+    Args:
+        sample (dict): One seeded object of each model, keyed by model name.
+
+    Returns:
+        list: ``(name, queryset)`` pairs.
+    """
+    user, cart, product, order = sample['user'], sample['cart'], sample['product'], sample['order']
+    return [
+        ('cart by session', Cart.objects.filter(cart_id=cart.cart_id)),
+        ('cart lines of a user', CartItem.objects.filter(user=user, is_active=True)),
+        ('cart lines of a session', CartItem.objects.filter(cart__cart_id=cart.cart_id, is_active=True)),
+        ('product in session cart', CartItem.objects.filter(cart=cart, product=product)),
+        ('order of a user', Order.objects.filter(user=user, order_number=order.order_number)),
+        ('available products of a category',
+         Product.objects.filter(is_available=True, category_id=product.category_id).order_by('id')[:12]),
+        ('available products of a gift',
+         Product.objects.filter(is_available=True, gift_id=product.gift_id).order_by('id')[:12]),
+        ('variations of a product',
+         Variation.objects.filter(product=product, variation_category='color', variation_value='red')),
+    ]
+
+
+class Command(BaseCommand):
+    """
+    Management command checking that the hot storefront queries use an index.
+
+    It seeds a large catalogue, carts and orders inside a transaction, captures
+    ``EXPLAIN`` for every query of ``hot_queries`` and rolls everything back. It fails
+    when a plan scans a whole table, so a dropped or unusable index is caught before
+    it reaches production.
+    """
+    help = 'Seeds a large dataset in a rolled back transaction and fails if a hot query plan is a full scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of products, carts and orders to seed.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCANS:
+            raise CommandError(f'Query plans cannot be checked on {connection.vendor}.')
+        prefix, scan = SEQUENTIAL_SCANS[connection.vendor]
+        failures = []
+        with transaction.atomic():
+            sample = self.seed(options['rows'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                for name, queryset in hot_queries(sample):
+                    sql, params = queryset.query.sql_with_params()
+                    cursor.execute(prefix + sql, params)
+                    plan = [row[-1] for row in cursor.fetchall()]
+                    tables = [match.group(1) for line in plan for match in [scan.search(line.strip())] if match]
+                    self.stdout.write(f'{name}:\n    ' + '\n    '.join(plan))
+                    if tables:
+                        failures.append(f"{name} scans {', '.join(tables)}")
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError('Sequential scans in hot query plans: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Every hot query uses an index.'))
+
+    def seed(self, rows):
+        """Bulk inserts ``rows`` products, carts and orders and returns one object of each model."""
+        batch = 1000
+        categories = Category.objects.bulk_create(
+            Category(category_name=f'plan-category-{i}', slug=f'plan-category-{i}') for i in range(rows // 100 + 1))
+        gifts = GiftCategory.objects.bulk_create(
+            GiftCategory(gift_name=f'plan-gift-{i}', slug=f'plan-gift-{i}') for i in range(rows // 100 + 1))
+        price = Price.objects.create(price=100)
+        products = Product.objects.bulk_create((
+            Product(product_name=f'plan-product-{i}', slug=f'plan-product-{i}', artist='plan', price=price,
+                    unit_price=100 + i % 1000, image='plan.jpg', stock=10, is_available=i % 10 != 0,
+                    category=categories[i % len(categories)], gift=gifts[i % len(gifts)])
+            for i in range(rows)), batch_size=batch)
+        Variation.objects.bulk_create((
+            Variation(product=product, variation_category=category, variation_value=value)
+            for product in products for category, value in (('color', 'red'), ('size', 'large'))), batch_size=batch)
+        users = Account.object.bulk_create((
+            Account(first_name='plan', last_name='plan', username=f'plan-user-{i}', email=f'plan-{i}@example.com',
+                    password='!') for i in range(rows // 10 + 1)), batch_size=batch)
+        carts = Cart.objects.bulk_create((Cart(cart_id=f'plan-cart-{i}') for i in range(rows)), batch_size=batch)
+        CartItem.objects.bulk_create((
+            CartItem(cart=cart if i % 2 else None, user=None if i % 2 else users[i % len(users)],
+                     product=products[i], variant_key=f'{products[i].pk}:', quantity=1)
+            for i, cart in enumerate(carts)), batch_size=batch)
+        orders = Order.objects.bulk_create((
+            Order(user=users[i % len(users)], order_number=f'plan{i}', first_name='plan', last_name='plan',
+                  phone='0', email='plan@example.com', address_line_1='plan', country='plan', state='plan',
+                  city='plan', order_total=100, tax='2') for i in range(rows)), batch_size=batch)
+        return {'user': users[1], 'cart': carts[1], 'product': products[1], 'order': orders[1]}
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+from store.search import normalize, search_backend
+
+
+def build_search_index(apps, schema_editor):
+    """Creates the search index of the database vendor and indexes existing products."""
+    Product = apps.get_model('store', 'Product')
+    backend = search_backend(schema_editor.connection)
+    backend.install(schema_editor)
+    for product in Product.objects.prefetch_related('variations'):
+        values = [variation.variation_value for variation in product.variations.all()]
+        document = normalize(' '.join([product.product_name, product.artist, *values]))
+        Product.objects.filter(pk=product.pk).update(search_document=document)
+        backend.index(product.pk, document)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_price_alter_product_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
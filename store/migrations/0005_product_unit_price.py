@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:46
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_prices(apps, schema_editor):
+    """Copies the price of every existing product to its unit price."""
+    Price = apps.get_model('store', 'Price')
+    Product = apps.get_model('store', 'Product')
+    Product.objects.update(unit_price=Subquery(Price.objects.filter(pk=OuterRef('price_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='unit_price',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(copy_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'unit_price', 'id'], name='product_available_price_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_product_unit_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', 'id'], name='product_available_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['gift', 'id'], name='product_available_gift_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variation',
+            index=models.Index(fields=['product', 'variation_category', 'variation_value'], name='variation_product_value_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='price',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='variation',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='variation',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
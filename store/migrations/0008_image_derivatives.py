@@ -0,0 +1,24 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:13
+
+import config.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_modified_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(storage=config.storage.content_storage, upload_to='photos/products'),
+        ),
+    ]
@@ -13,6 +13,7 @@ Dependencies:
     reverse: Function from django.urls for generating URLs.
     Category: Model from category.models for defining product categories.
     GiftCategory: Model from category.models for defining gift categories.
+    content_storage: Function from config.storage returning the content-addressed media storage.
 
 Attributes:
     price: IntegerField representing the price of a product.
@@ -21,13 +22,17 @@ Attributes:
     description: TextField representing the description of a product.
     artist: CharField representing the artist of a product.
     price: ForeignKey representing the price of a product.
-    image: ImageField representing the image of a product.
+    unit_price: IntegerField holding a copy of the product's price for listings, carts and range filters.
+    image: ImageField representing the image of a product, stored under its content hash.
+    image_derivatives: JSONField holding the resized and WebP versions of the image.
     stock: IntegerField representing the stock quantity of a product.
     is_available: BooleanField representing whether a product is available for purchase.
     category: ForeignKey representing the category of a product.
     gift: ForeignKey representing the gift category of a product.
     created_date: DateTimeField representing the date and time when a product was created.
-    modified_date: DateTimeField representing the date and time when a product was last modified.
+    modified_date: DateTimeField representing the date and time when a product, its price or its variations
+        were last modified, used to key the cached product fragments.
+    search_document: TextField holding the normalised name, artist and variation values used for searching.
     get_url(): Method to get the URL of a product.
     VariationManager: Manager class for Variation model providing methods for filtering variations by category.
     variation_category_choice: Choices for the variation category field.
@@ -38,11 +43,13 @@ from django.db import models
 from django.urls import reverse
 
 from category.models import Category, GiftCategory
+from config.storage import content_storage
 
 
 class Price(models.Model):
     """Model for storing product prices."""
     price = models.IntegerField()
+    modified_date = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.price}"
@@ -55,13 +62,25 @@ class Product(models.Model):
     description = models.TextField(max_length=500, blank=True)
     artist = models.CharField(max_length=255)
     price = models.ForeignKey(Price, on_delete=models.CASCADE, related_name='products')
-    image = models.ImageField(upload_to='photos/products')
+    unit_price = models.IntegerField(default=0, editable=False)
+    image = models.ImageField(upload_to='photos/products', storage=content_storage)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.IntegerField()
     is_available = models.BooleanField(default=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     gift = models.ForeignKey(GiftCategory, on_delete=models.CASCADE, related_name='products')
     created_date = models.DateTimeField(auto_now_add=True)
-    modified_date = models.DateTimeField(auto_now_add=True)
+    modified_date = models.DateTimeField(auto_now=True)
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_available', 'unit_price', 'id'], name='product_available_price_idx'),
+            models.Index(fields=['category', 'id'], condition=models.Q(is_available=True),
+                         name='product_available_category_idx'),
+            models.Index(fields=['gift', 'id'], condition=models.Q(is_available=True),
+                         name='product_available_gift_idx'),
+        ]
 
     def get_url(self):
         """Method to get the URL of a product."""
@@ -93,9 +112,16 @@ class Variation(models.Model):
     variation_category = models.CharField(max_length=100, choices=variation_category_choice)
     variation_value = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
-    created_date = models.DateTimeField(auto_now=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    modified_date = models.DateTimeField(auto_now=True)
 
     objects = VariationManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'variation_category', 'variation_value'],
+                         name='variation_product_value_idx'),
+        ]
+
     def __str__(self):
         return self.variation_value
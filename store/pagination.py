@@ -0,0 +1,315 @@
+"""
+Keyset (cursor) pagination for product listings.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row seen,
+and fetched with a ``WHERE (key, id) > (...)`` condition on the ordering index
+instead of ``OFFSET``, so a deep page costs the same as the first one. Totals are
+cached per filter combination instead of being counted on every page view.
+
+Classes:
+    KeysetPage: A page of results with cursors to its neighbours.
+    KeysetPaginator: Paginator over a queryset ordered on unique keys.
+    BitsetPaginator: Paginator over the product ids set in a bitset.
+
+Functions:
+    page_size: Returns the page size requested by a visitor.
+    cached_count: Returns the cached number of rows of a queryset.
+    acached_count: Async cached_count.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+def page_size(request):
+    """
+    Returns the page size requested with the ``per_page`` parameter.
+
+    Args:
+        request: HttpRequest object representing the HTTP request.
+
+    Returns:
+        int: The requested size if it is one of ``STORE_PAGE_SIZES``, otherwise the first of them.
+    """
+    try:
+        size = int(request.GET.get('per_page', ''))
+    except ValueError:
+        size = None
+    return size if size in settings.STORE_PAGE_SIZES else settings.STORE_PAGE_SIZES[0]
+
+
+def _count_key(queryset):
+    """Returns the cache key of the count of a queryset, or None if the queryset cannot match any row."""
+    try:
+        return f'store:count:{hashlib.md5(str(queryset.query).encode()).hexdigest()}'
+    except EmptyResultSet:
+        return None
+
+
+def cached_count(queryset):
+    """
+    Returns the number of rows of a queryset, cached per query.
+
+    Args:
+        queryset (QuerySet): The filtered queryset.
+
+    Returns:
+        int: The number of rows, at most ``STORE_COUNT_CACHE_TIMEOUT`` seconds old.
+    """
+    key = _count_key(queryset)
+    if key is None:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.STORE_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+async def acached_count(queryset):
+    """Async ``cached_count``, counting with the async ORM on a cache miss."""
+    key = _count_key(queryset)
+    if key is None:
+        return 0
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, settings.STORE_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class KeysetPage:
+    """
+    A page of results with cursors to its neighbours.
+
+    Attributes:
+        object_list: The objects on the page.
+        next_cursor: The cursor of the next page, or None on the last page.
+        previous_cursor: The cursor of the previous page, or None on the first page.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, query):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._query = query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _url(self, cursor):
+        query = self._query.copy()
+        query['cursor'] = cursor
+        return f'?{query.urlencode()}'
+
+    def next_url(self):
+        """Returns the query string of the next page."""
+        return self._url(self.next_cursor)
+
+    def previous_url(self):
+        """Returns the query string of the previous page."""
+        return self._url(self.previous_cursor)
+
+
+class KeysetPaginator:
+    """
+    Paginator over a queryset ordered on keys that are unique together.
+
+    Args:
+        queryset (QuerySet): The filtered queryset.
+        keys (tuple): The ordering, e.g. ``('id',)`` or ``('-price', '-id')``. The last key must be unique.
+        per_page (int): The number of objects per page.
+    """
+
+    def __init__(self, queryset, keys, per_page):
+        self.queryset = queryset
+        self.keys = keys
+        self.per_page = per_page
+
+    @staticmethod
+    def encode(direction, values):
+        payload = json.dumps([direction, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            return None, None
+        if direction not in ('n', 'p') or not isinstance(values, list):
+            return None, None
+        return direction, values
+
+    def _values(self, obj):
+        values = []
+        for key in self.keys:
+            value = obj
+            for attr in key.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _after(self, values, reverse):
+        """Builds the condition selecting the rows after ``values`` in the (possibly reversed) ordering."""
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            field = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            step = Q(**{f'{field}__{"lt" if descending else "gt"}': values[position]})
+            for previous_key, previous_value in zip(self.keys[:position], values):
+                step &= Q(**{previous_key.lstrip('-'): previous_value})
+            condition |= step
+        return condition
+
+    def _fetch(self, values, backwards, limit):
+        """
+        Fetches the rows following a cursor.
+
+        Args:
+            values (list): The key values of the cursor, or None for the first page.
+            backwards (bool): Whether to fetch the rows preceding the cursor, nearest first.
+            limit (int): The maximum number of rows.
+
+        Returns:
+            list: The rows in fetch order.
+        """
+        return list(self._page_queryset(values, backwards, limit))
+
+    async def _afetch(self, values, backwards, limit):
+        """Async ``_fetch``, using the async ORM."""
+        return [row async for row in self._page_queryset(values, backwards, limit)]
+
+    def _page_queryset(self, values, backwards, limit):
+        ordering = self.keys
+        if backwards:
+            ordering = [key[1:] if key.startswith('-') else f'-{key}' for key in self.keys]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        return queryset[:limit]
+
+    def get_page(self, request):
+        """
+        Returns the page addressed by the ``cursor`` parameter of the request.
+
+        Args:
+            request: HttpRequest object representing the HTTP request.
+
+        Returns:
+            KeysetPage: The requested page, or the first page if the cursor is missing or invalid.
+        """
+        values, backwards = self._cursor(request)
+        return self._page(request, values, backwards, self._fetch(values, backwards, self.per_page + 1))
+
+    async def aget_page(self, request):
+        """Async ``get_page``, fetching the rows with the async ORM."""
+        values, backwards = self._cursor(request)
+        return self._page(request, values, backwards, await self._afetch(values, backwards, self.per_page + 1))
+
+    def _key_field(self, key):
+        """Returns the model field or annotation output field of an ordering key."""
+        name = key.lstrip('-')
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        model = self.queryset.model
+        for attr in name.split('__'):
+            field = model._meta.pk if attr == 'pk' else model._meta.get_field(attr)
+            model = field.related_model
+        return field
+
+    def _cursor(self, request):
+        """Returns the key values and direction of the request's cursor, None and False for the first page."""
+        direction, values = self.decode(request.GET.get('cursor', ''))
+        if values is None or len(values) != len(self.keys):
+            return None, False
+        try:
+            # The cursor comes from the visitor: every value must convert to the type of its key
+            values = [self._key_field(key).to_python(value) for key, value in zip(self.keys, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None, False
+        if None in values:
+            return None, False
+        return values, direction == 'p'
+
+    def _page(self, request, values, backwards, rows):
+        """Builds the page from the fetched rows."""
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode('n', self._values(rows[-1]))
+            if (has_more and backwards) or (values is not None and not backwards):
+                previous_cursor = self.encode('p', self._values(rows[0]))
+        return KeysetPage(rows, next_cursor, previous_cursor, request.GET)
+
+
+class BitsetPaginator(KeysetPaginator):
+    """
+    Paginator over the product ids set in a bitset, in ascending id order.
+
+    Only the ids of the requested page are hydrated into objects.
+
+    Args:
+        bits (int): The bitset, bit ``n`` being set when product ``n`` is included.
+        queryset (QuerySet): The queryset used to hydrate the ids of a page.
+        per_page (int): The number of objects per page.
+    """
+
+    def __init__(self, bits, queryset, per_page):
+        super().__init__(queryset, ('id',), per_page)
+        self.bits = bits
+
+    def _fetch(self, values, backwards, limit):
+        ids = self._ids(values, backwards, limit)
+        objects = self.queryset.in_bulk(ids)
+        return [objects[product_id] for product_id in ids if product_id in objects]
+
+    async def _afetch(self, values, backwards, limit):
+        ids = self._ids(values, backwards, limit)
+        objects = await self.queryset.ain_bulk(ids)
+        return [objects[product_id] for product_id in ids if product_id in objects]
+
+    def _ids(self, values, backwards, limit):
+        """Returns the ids of the page following a cursor, in fetch order."""
+        ids = []
+        if values is not None and (not isinstance(values[0], int) or values[0] < 0):
+            values, backwards = None, False
+        # The cursor comes from the visitor: no shift may go past the highest id of the bitset
+        position = min(values[0], self.bits.bit_length()) if values is not None else None
+        if backwards:
+            rest = self.bits & ((1 << position) - 1)
+            while rest and len(ids) < limit:
+                product_id = rest.bit_length() - 1
+                ids.append(product_id)
+                rest ^= 1 << product_id
+        else:
+            start = position + 1 if values is not None else 0
+            rest = self.bits >> start << start
+            while rest and len(ids) < limit:
+                lowest = rest & -rest
+                ids.append(lowest.bit_length() - 1)
+                rest ^= lowest
+        return ids
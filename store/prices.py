@@ -0,0 +1,73 @@
+"""
+Cached price histogram for the price range filter.
+
+The store sidebar offers the minimum and maximum price as bucket edges over the
+prices of the available products instead of one option per ``Price`` row. The
+buckets are computed with one ``GROUP BY`` on the denormalised ``unit_price``
+column, kept in the shared Django cache and only dropped by the receivers in
+``store.signals`` when a price or a product changes.
+
+Functions:
+    price_histogram: Returns the cached price buckets.
+    aprice_histogram: Async price_histogram, computing in the sync thread.
+    invalidate: Drops the cached buckets once the transaction commits.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+
+HISTOGRAM_KEY = 'store:price-histogram'
+
+
+def _compute(buckets):
+    from .models import Product
+
+    products = Product.objects.filter(is_available=True)
+    bounds = products.aggregate(low=Min('unit_price'), high=Max('unit_price'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+    width = max(1, -(-(high - low + 1) // buckets))
+    counts = dict(
+        products.annotate(bucket=(F('unit_price') - low) / width)
+        .values_list('bucket').annotate(count=Count('id')).order_by()
+    )
+    return [
+        {'low': low + index * width, 'high': min(high, low + (index + 1) * width - 1), 'count': counts[index]}
+        for index in sorted(counts)
+    ]
+
+
+def price_histogram():
+    """
+    Returns the price buckets of the available products, computing them on a cache miss.
+
+    Returns:
+        list: ``{'low', 'high', 'count'}`` dicts in ascending order, empty buckets left out.
+    """
+    histogram = cache.get(HISTOGRAM_KEY)
+    if histogram is None:
+        histogram = _compute(settings.STORE_PRICE_HISTOGRAM_BUCKETS)
+        cache.set(HISTOGRAM_KEY, histogram, timeout=None)
+    return histogram
+
+
+async def aprice_histogram():
+    """
+    Async ``price_histogram``, computing the buckets in the sync thread on a cache miss.
+
+    Returns:
+        list: ``{'low', 'high', 'count'}`` dicts in ascending order, empty buckets left out.
+    """
+    histogram = await cache.aget(HISTOGRAM_KEY)
+    if histogram is None:
+        histogram = await sync_to_async(price_histogram)()
+    return histogram
+
+
+def invalidate():
+    """Drops the cached price buckets once the transaction commits."""
+    transaction.on_commit(lambda: cache.delete(HISTOGRAM_KEY))
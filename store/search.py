@@ -0,0 +1,192 @@
+"""
+Full-text product search.
+
+Every product stores a normalised ``search_document`` made of its name, artist and
+variation values, kept up to date by the receivers in ``store.signals``. The
+document is indexed by a backend chosen from the database vendor:
+
+* PostgreSQL: a GIN index over ``to_tsvector('simple', search_document)`` for
+  prefix word matches plus a ``pg_trgm`` GIN index for substring matches.
+* SQLite: an FTS5 table keyed by the product id, for local runs.
+* Anything else: a plain ``icontains`` scan of the document.
+
+Persian and Arabic text is normalised the same way on both the document and the
+query, so Arabic yeh/kaf, ZWNJ and Persian or Arabic digits all hit the index.
+
+Functions:
+    normalize: Normalises Persian/Arabic text for indexing and lookups.
+    product_document: Builds the search document of a product.
+    search_backend: Returns the search backend of a database connection.
+    search_products: Returns the products matching a keyword, annotated with their rank.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+_CHARACTERS = str.maketrans({
+    '\u064a': '\u06cc',  # Arabic yeh -> Persian yeh
+    '\u0649': '\u06cc',  # Alef maksura -> Persian yeh
+    '\u0643': '\u06a9',  # Arabic kaf -> Persian kaf
+    '\u0629': '\u0647',  # Teh marbuta -> heh
+    '\u200c': ' ',  # Zero-width non-joiner
+    '\u200d': '',  # Zero-width joiner
+    '\u0640': '',  # Tatweel
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # Persian digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic digits
+})
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+_WHITESPACE = re.compile(r'\s+')
+_TERMS = re.compile(r'\w+')
+
+
+def normalize(text):
+    """
+    Normalises Persian/Arabic text for indexing and lookups.
+
+    Args:
+        text (str): The text to normalise.
+
+    Returns:
+        str: The lower-cased text with unified letters and digits, without diacritics
+        and with single spaces.
+    """
+    text = _DIACRITICS.sub('', text.translate(_CHARACTERS))
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+def product_document(product):
+    """
+    Builds the search document of a product from its name, artist and variation values.
+
+    Args:
+        product (Product): The product.
+
+    Returns:
+        str: The normalised search document.
+    """
+    from store.models import Variation
+
+    values = []
+    if product.pk:
+        values = Variation.objects.filter(product_id=product.pk).values_list('variation_value', flat=True)
+    return normalize(' '.join([product.product_name, product.artist, *values]))
+
+
+class SearchBackend:
+    """Fallback backend scanning the search document with ``icontains``."""
+
+    def install(self, schema_editor):
+        """Creates the database objects of the backend."""
+
+    def index(self, product_id, document):
+        """Stores the search document of a product in the index."""
+
+    def remove(self, product_id):
+        """Removes a product from the index."""
+
+    def search(self, queryset, keyword):
+        """
+        Filters a product queryset by a normalised keyword and annotates the rank.
+
+        Args:
+            queryset (QuerySet): The products to search.
+            keyword (str): The normalised keyword.
+
+        Returns:
+            QuerySet: The matching products with a ``rank`` annotation.
+        """
+        return queryset.filter(search_document__icontains=keyword).annotate(rank=Value(0.0))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Backend using a ``tsvector`` GIN index and a trigram GIN index."""
+
+    def install(self, schema_editor):
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS store_product_search_fts ON store_product "
+            "USING gin (to_tsvector('simple', search_document))")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS store_product_search_trgm ON store_product "
+            "USING gin (search_document gin_trgm_ops)")
+
+    def search(self, queryset, keyword):
+        tsquery = ' & '.join(f'{term}:*' for term in _TERMS.findall(keyword))
+        pattern = '%{}%'.format(keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        document = 'to_tsvector(\'simple\', "store_product"."search_document")'
+        matches = RawSQL(
+            f"({document} @@ to_tsquery('simple', %s) OR \"store_product\".\"search_document\" ILIKE %s)",
+            [tsquery, pattern], output_field=BooleanField())
+        rank = RawSQL(
+            f"(ts_rank({document}, to_tsquery('simple', %s)) "
+            f"+ word_similarity(%s, \"store_product\".\"search_document\"))::float8",
+            [tsquery, keyword], output_field=FloatField())
+        return queryset.filter(matches).annotate(rank=rank)
+
+
+class SqliteSearchBackend(SearchBackend):
+    """Backend using an FTS5 table keyed by the product id."""
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts "
+            "USING fts5(document, tokenize = 'unicode61 remove_diacritics 2')")
+
+    def index(self, product_id, document):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM store_product_fts WHERE rowid = %s", [product_id])
+            cursor.execute("INSERT INTO store_product_fts (rowid, document) VALUES (%s, %s)",
+                           [product_id, document])
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM store_product_fts WHERE rowid = %s", [product_id])
+
+    def search(self, queryset, keyword):
+        match = ' '.join(f'"{term}"*' for term in _TERMS.findall(keyword))
+        matches = RawSQL(
+            '"store_product"."id" IN (SELECT rowid FROM store_product_fts WHERE store_product_fts MATCH %s)',
+            [match], output_field=BooleanField())
+        rank = RawSQL(
+            '(SELECT -bm25(store_product_fts) FROM store_product_fts '
+            'WHERE store_product_fts MATCH %s AND rowid = "store_product"."id")',
+            [match], output_field=FloatField())
+        return queryset.filter(matches).annotate(rank=rank)
+
+
+def search_backend(using=None):
+    """
+    Returns the search backend of a database connection.
+
+    Args:
+        using: The database connection, the default connection if None.
+
+    Returns:
+        SearchBackend: The backend for the vendor of the connection.
+    """
+    vendor = (using or connection).vendor
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return SearchBackend()
+
+
+def search_products(queryset, keyword):
+    """
+    Returns the products matching a keyword, annotated with their rank.
+
+    Args:
+        queryset (QuerySet): The products to search.
+        keyword (str): The keyword entered by the visitor.
+
+    Returns:
+        QuerySet: The matching products with a ``rank`` annotation, empty if the keyword has no terms.
+    """
+    keyword = normalize(keyword)
+    if not _TERMS.search(keyword):
+        return queryset.none().annotate(rank=Value(0.0))
+    return search_backend().search(queryset, keyword)
@@ -0,0 +1,141 @@
+# Importing necessary modules for handling signals
+from django.db import transaction  # Module for database transactions
+from django.utils import timezone  # Current time for touching modified products
+from django.db.models.signals import post_delete, post_save, pre_save  # Signals for save and delete events
+from django.dispatch import receiver  # Decorator for connecting receivers to signals
+
+# Importing the store models and search helpers from the current directory
+from .models import Price, Product, Variation  # Models making up the search document and facets
+from .search import product_document, search_backend  # Helpers maintaining the search index
+from . import autocomplete, facets, images, prices  # In-process indexes, image derivatives and the price histogram
+from category.models import Category, GiftCategory  # Models with images
+
+# The image field of each model with images
+IMAGE_FIELDS = {Product: 'image', Category: 'cat_image', GiftCategory: 'gift_image'}
+
+# Define a receiver refreshing the search document before a product is saved
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    """
+    Receiver function computing the search document and copying the price of a product before it is saved.
+
+    Args:
+        sender: The sender model class.
+        instance: The product being saved.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    instance.search_document = product_document(instance)
+    instance.unit_price = instance.price.price
+
+
+# Define a receiver indexing a saved product
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """
+    Receiver function storing the search document of a saved product in the index
+    and updating the autocomplete and facet indexes once the transaction commits.
+
+    Args:
+        sender: The sender model class.
+        instance: The saved product.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    search_backend().index(instance.pk, instance.search_document)
+    transaction.on_commit(lambda: autocomplete.product_changed(instance))
+    facets.product_changed(instance.pk)
+    prices.invalidate()
+
+
+# Define a receiver removing a deleted product from the index
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """
+    Receiver function removing a deleted product from the search, autocomplete and facet indexes.
+
+    Args:
+        sender: The sender model class.
+        instance: The deleted product.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    search_backend().remove(instance.pk)
+    product_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.product_removed(product_id))
+    facets.product_changed(product_id)
+    prices.invalidate()
+
+
+# Define a receiver refreshing the product document when its variations change
+@receiver(post_save, sender=Variation)
+@receiver(post_delete, sender=Variation)
+def variation_changed(sender, instance, **kwargs):
+    """
+    Receiver function refreshing the search document, facets and modification time of a product
+    when a variation changes.
+
+    Args:
+        sender: The sender model class.
+        instance: The saved or deleted variation.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    facets.product_changed(instance.product_id)
+    product = Product.objects.filter(pk=instance.product_id).only('product_name', 'artist').first()
+    if product is None:
+        return
+    document = product_document(product)
+    Product.objects.filter(pk=product.pk).update(search_document=document, modified_date=timezone.now())
+    search_backend().index(product.pk, document)
+
+
+# Define a receiver rebuilding the facets when a price changes
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+def price_changed(sender, instance, created=False, **kwargs):
+    """
+    Receiver function copying a changed price to its products and making every process
+    rebuild its facet index and price histogram.
+
+    Args:
+        sender: The sender model class.
+        instance: The saved or deleted price.
+        created: Whether the price was just created.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    if kwargs['signal'] is post_save and not created:
+        Product.objects.filter(price=instance).update(unit_price=instance.price, modified_date=timezone.now())
+    facets.invalidate()
+    prices.invalidate()
+
+
+# Define a receiver generating the derivatives of a changed image
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=GiftCategory)
+def image_saved(sender, instance, **kwargs):
+    """
+    Receiver function scheduling the resized and WebP versions of a product, category or gift
+    image whose file changed.
+
+    Args:
+        sender: The sender model class.
+        instance: The saved row.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+        None
+    """
+    images.schedule(instance, IMAGE_FIELDS[sender])
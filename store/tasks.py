@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from store import images
+
+
+@shared_task
+def generate_image_derivatives(model_label, pk, field_name):
+    """Task rendering and recording the resized and WebP versions of a row's image after it changed."""
+    return images.generate([(model_label, pk, field_name)])
@@ -0,0 +1,54 @@
+"""
+Template tags rendering images with their derivatives.
+
+Usage::
+
+    {% load responsive_images %}
+    {% picture product.image sizes="(max-width: 576px) 100vw, 300px" size="medium" %}
+
+Functions:
+    picture: Renders a ``<picture>`` offering the WebP and resized versions of an image.
+"""
+
+from django import template
+from django.utils.html import format_html
+
+from config.storage import content_storage
+from store import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, sizes='100vw', size=None, css_class='', alt='', loading='lazy'):
+    """
+    Renders a ``<picture>`` offering the WebP and resized versions of an image through ``srcset``.
+
+    An image without derivatives yet, or a row without a ``<field>_derivatives``
+    column, renders as a plain ``<img>`` of the original.
+
+    Args:
+        image: The ImageFieldFile to render.
+        sizes (str): The ``sizes`` attribute, the width the image is displayed at.
+        size (str): The derivative used as ``src`` by browsers without ``srcset``, the original by default.
+        css_class (str): The class of the ``<img>``.
+        alt (str): The alternative text of the ``<img>``.
+        loading (str): 'lazy', or 'eager' for an image shown above the fold.
+
+    Returns:
+        str: The HTML of the image.
+    """
+    if not image:
+        return ''
+    recorded = images.derivatives(image)
+    if recorded is None:
+        return format_html('<img src="{}" class="{}" alt="{}" loading="{}">', image.url, css_class, alt, loading)
+    src = image.url
+    entry = recorded['sizes'].get(size)
+    if entry is not None:
+        src = content_storage().url(entry.get('jpeg', entry.get('png')))
+    webp = images.srcset(image, 'webp')
+    source = format_html('<source type="image/webp" srcset="{}" sizes="{}">', webp, sizes) if webp else ''
+    return format_html('<picture>{}<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="{}" '
+                       'decoding="async"></picture>', source, src, images.srcset(image), sizes, css_class, alt,
+                       loading)
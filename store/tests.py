@@ -1,3 +1,203 @@
-from django.test import TestCase
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, engines
+from django.templatetags.static import StaticNode
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from account.models import Account
+from category.models import Category, GiftCategory
+from config.queries import QueryBudgetMiddleware, query_budget
+from config.storage import CompressedManifestStaticFilesStorage
+from store import facets
+from store.management.commands.check_query_plans import SEQUENTIAL_SCANS
+from store.models import Price, Product, Variation
+from store.pagination import BitsetPaginator, KeysetPaginator
+
+
+def create_product():
+    """Creates an available product with a color and a size variation, in a category and a gift."""
+    product = Product.objects.create(
+        product_name='Mona', slug='mona', artist='Leo', image='photos/products/mona.jpg', stock=100,
+        price=Price.objects.create(price=100),
+        category=Category.objects.create(category_name='Paint', slug='paint'),
+        gift=GiftCategory.objects.create(gift_name='Birthday', slug='birthday'),
+    )
+    Variation.objects.create(product=product, variation_category='color', variation_value='Red')
+    Variation.objects.create(product=product, variation_category='size', variation_value='Large')
+    return product
+
+
+def create_user():
+    """Creates a customer account."""
+    return Account.object.create_user('Ada', 'Byron', 'ada', 'ada@example.com', 'password')
+
+
+class ManifestOnlyStorage(CompressedManifestStaticFilesStorage):
+    """The static files storage writing the same names and manifest, without the slow compression."""
+
+    manifest_strict = True
+
+    def compress(self, name):
+        return iter(())
+
+
+class StaticTemplateTests(SimpleTestCase):
+    """Resolves every ``{% static %}`` of the project templates against a collectstatic manifest."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.manifest = override_settings(STATIC_ROOT=cls.static_root.name, STORAGES={
+            **settings.STORAGES, 'staticfiles': {'BACKEND': 'store.tests.ManifestOnlyStorage'},
+        })
+        cls.manifest.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.manifest.disable()
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    @override_settings(DEBUG=False)
+    def test_static_names_are_in_the_manifest(self):
+        engine = engines['django']
+        checked = 0
+        for directory in engine.dirs:
+            for path in sorted(Path(directory).rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                for node in engine.get_template(name).template.nodelist.get_nodes_by_type(StaticNode):
+                    with self.subTest(template=name, static=node.path.token):
+                        node.url(Context())
+                    checked += 1
+        self.assertGreater(checked, 0)
+
+
+class BitsetPaginatorTests(SimpleTestCase):
+    """Pages of ids read from a bitset, addressed by cursors the visitor may have forged."""
+
+    def setUp(self):
+        self.paginator = BitsetPaginator(sum(1 << product_id for product_id in (2, 3, 5, 8)), Product.objects.all(), 2)
+
+    def test_pages(self):
+        self.assertEqual(self.paginator._ids(None, False, 2), [2, 3])
+        self.assertEqual(self.paginator._ids([3], False, 2), [5, 8])
+        self.assertEqual(self.paginator._ids([8], True, 2), [5, 3])
+
+    def test_cursor_past_the_bitset_is_clamped(self):
+        self.assertEqual(self.paginator._ids([10 ** 15], True, 2), [8, 5])
+        self.assertEqual(self.paginator._ids([10 ** 15], False, 2), [])
+
+
+class KeysetCursorTests(SimpleTestCase):
+    """Cursors of the search results, ordered on the rank annotation and the id."""
+
+    def setUp(self):
+        products = Product.objects.annotate(rank=Value(0.0, output_field=FloatField()))
+        self.paginator = KeysetPaginator(products, ('-rank', '-id'), 12)
+
+    def cursor(self, direction, values):
+        return self.paginator._cursor(RequestFactory().get('/', {'cursor': self.paginator.encode(direction, values)}))
+
+    def test_values_take_the_type_of_their_key(self):
+        self.assertEqual(self.cursor('p', ['0.5', '7']), ([0.5, 7], True))
+
+    def test_forged_values_fall_back_to_the_first_page(self):
+        for values in (['abc', 'x'], [{}, []], [None, 1], [1.0], [1.0, 2, 3]):
+            with self.subTest(values=values):
+                self.assertEqual(self.cursor('n', values), (None, False))
+
+
+class QueryBudgetTests(TestCase):
+    """Store pages within their ``QUERY_BUDGETS``, with the per-process caches cold then warm."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_store(self):
+        for _ in range(2):
+            with query_budget('store'):
+                response = self.client.get(reverse('store'))
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={'/async/': 0})
+    def test_middleware_records_async_requests_without_adapting_them(self):
+        async def view(request):
+            return HttpResponse(await sync_to_async(Product.objects.count)())
+
+        middleware = QueryBudgetMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('config.queries', 'WARNING') as logs:
+            async_to_sync(middleware)(RequestFactory().get('/async/'))
+        self.assertIn('/async/ ran 1 queries, over its budget of 0.', logs.output[0])
+
+    def test_single_product(self):
+        url = self.product.get_url()
+        for _ in range(2):
+            with query_budget('single_product'):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+
+
+class FacetIndexTests(TestCase):
+    """The facet index of a process catching up with the changes made by the other processes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.multiple(facets, _index=None, _version=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def change_elsewhere(self, change):
+        """Runs a change as another process would, leaving this process's index stale."""
+        index, version = facets.get_index(), facets._version
+        facets._index = None
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        facets._index, facets._version = index, version
+        return index
+
+    def test_product_changes_are_replayed(self):
+        index = self.change_elsewhere(lambda: Product.objects.create(
+            product_name='Lisa', slug='lisa', artist='Leo', image='photos/products/lisa.jpg', stock=1,
+            price=self.product.price, category=self.product.category, gift=self.product.gift))
+        with mock.patch.object(facets, 'FacetIndex', side_effect=AssertionError('rebuilt')):
+            self.assertIs(facets.get_index(), index)
+        self.assertEqual(index.query(category=self.product.category_id).count, 2)
+        self.assertEqual(facets._version, facets.version())
+
+    def test_invalidation_rebuilds(self):
+        index = self.change_elsewhere(facets.invalidate)
+        self.assertIsNot(facets.get_index(), index)
+        self.assertEqual(facets._version, facets.version())
+
+
+@skipUnless(connection.vendor in SEQUENTIAL_SCANS, 'Query plans are only read on PostgreSQL and SQLite.')
+class QueryPlanTests(TestCase):
+    """The hot storefront queries use an index on a seeded catalogue."""
+
+    def test_hot_queries_use_an_index(self):
+        output = StringIO()
+        call_command('check_query_plans', rows=3000, stdout=output)
+        self.assertIn('Every hot query uses an index.', output.getvalue())
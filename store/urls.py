@@ -12,12 +12,14 @@ URL Patterns:
     'category/<slug:category_slug>/' : URL pattern for browsing products by category.
     'category/<slug:category_slug>/<slug:product_slug>/' : URL pattern for displaying details of a single product.
     'search/' : URL pattern for searching products.
+    'search/autocomplete/' : URL pattern for search-box suggestions.
     'gift/<slug:gift_slug>/' : URL pattern for browsing products by gift category.
 
 Attributes:
     views.Store.as_view(): View class for handling store-related requests.
     views.SingleProduct.as_view(): View class for displaying details of a single product.
     views.Search.as_view(): View class for searching products.
+    views.autocomplete: View function returning search-box suggestions.
 """
 
 from django.urls import path
@@ -28,5 +30,6 @@ urlpatterns = [
     path('category/<slug:category_slug>/', views.Store.as_view(), name='products_by_category'),
     path('category/<slug:category_slug>/<slug:product_slug>/', views.SingleProduct.as_view(), name='single_product'),
     path('search/', views.Search.as_view(), name='search'),
+    path('search/autocomplete/', views.autocomplete, name='autocomplete'),
     path('gift/<slug:gift_slug>/', views.Store.as_view(), name='products_by_gift')
 ]
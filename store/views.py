@@ -2,89 +2,114 @@
 This module provides views for interacting with the store, including browsing products,
 viewing individual product details, and searching for products.
 
+The catalogue views are native async views: their queries go through Django's async
+ORM and they render on the event loop once ``config.asyncviews`` prepared the request.
+
 Classes:
-    Store: APIView for browsing products, optionally filtered by category and price range.
-    SingleProduct: APIView for displaying details of a single product.
-    Search: APIView for searching products based on a keyword.
+    Store: Async view for browsing products, optionally filtered by category, gift, variations and price range.
+    SingleProduct: Async view for displaying details of a single product.
+    Search: Async view for searching products based on a keyword, ranked by the full-text search backend.
+    autocomplete: Function-based view returning search-box suggestions from the in-process prefix index.
 
 Dependencies:
     Django: The web framework used for developing the application.
-    Paginator: Paginator class from django.core.paginator for paginating querysets.
-    Q: Q class from django.db.models for complex query lookups.
+    KeysetPaginator: Cursor-based paginator from store.pagination for paginating querysets.
     HttpResponse: HttpResponse class from django.http for returning HTTP responses.
-    render: Function from django.shortcuts for rendering HTML templates.
-    get_object_or_404: Function from django.shortcuts for retrieving objects or raising a 404 error if not found.
-    APIView: Base class from rest_framework.views for defining API views.
+    View: Base class from django.views for defining the async views.
+    render: Async function from config.asyncviews for rendering HTML templates.
+    get_object_or_404: Async function from config.asyncviews for retrieving objects or raising a 404 error if not
+        found.
+    condition: Async decorator from config.asyncviews answering conditional GETs from the store.conditional
+        validators.
+    vary_on_cookie: Async decorator from config.asyncviews marking pages as varying with the visitor.
+    method_decorator: Function from config.asyncviews applying the async decorators to the view methods.
 
 Attributes:
     _cart_id: Function from cart.views for getting the cart ID.
     Category: Model from category.models for defining product categories.
     Product: Model from store.models for defining products.
-    Price: Model from store.models for defining product prices.
+    aprice_histogram: Async function from store.prices returning the cached price buckets.
     Cart: Model from cart.models for defining shopping carts.
     CartItem: Model from cart.models for defining items in the shopping cart.
 """
 
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponse
-from django.shortcuts import render, get_object_or_404
-from rest_framework.views import APIView
+from django.http import HttpResponse, JsonResponse
+from django.views import View
 
 from cart.views import _cart_id
+from category.menu import categories
 from category.models import Category, GiftCategory
-from store.models import Product, Price
+from config.asyncviews import condition, get_object_or_404, method_decorator, render, vary_on_cookie
+from store import facets
+from store.models import Product, variation_category_choice
+from store.prices import aprice_histogram
+from store.conditional import listing_etag, listing_last_modified, product_etag
+from store.pagination import BitsetPaginator, KeysetPaginator, acached_count, page_size
+from store.autocomplete import get_index
+from store.search import search_products
 from cart.models import Cart, CartItem
 
 
-class Store(APIView):
+@method_decorator([vary_on_cookie, condition(listing_etag, listing_last_modified)], name='get')
+class Store(View):
     """
-    APIView for browsing products in the store, optionally filtered by category and price range.
+    Async view for browsing products in the store, optionally filtered by category, gift, variations and
+    price range, with facet counts from the in-memory facet engine. Revisits are answered with a
+    304 when the catalogue and the visitor's header did not change.
     """
 
-    def get(self, request, category_slug=None, gift_slug=None):
+    async def get(self, request, category_slug=None, gift_slug=None):
         """
         Handles GET requests for browsing products.
 
         Args:
             request: HttpRequest object representing the HTTP request.
             category_slug: Optional slug of the category to filter products by.
+            gift_slug: Optional slug of the gift category to filter products by.
 
         Returns:
             HttpResponse object with the rendered HTML template displaying products.
         """
-        cats = Category.objects.all()
-        products = Product.objects.filter(is_available=True).order_by('id')
-        prices = Price.objects.all()
-        min_price = request.GET.get("min_price")
-        max_price = request.GET.get("max_price")
+        cats = categories(request)
+        prices = await aprice_histogram()
+        filters = {}
 
         if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            products = products.filter(category=category)
+            category = await get_object_or_404(Category, slug=category_slug)
+            filters['category'] = category.id
 
         if gift_slug:
-            gift = get_object_or_404(GiftCategory, slug=gift_slug)
-            products = products.filter(gift=gift)
+            gift = await get_object_or_404(GiftCategory, slug=gift_slug)
+            filters['gift'] = gift.id
+
+        try:
+            filters['price_range'] = (int(request.GET["min_price"]), int(request.GET["max_price"]))
+        except (KeyError, ValueError):
+            pass
 
-        if min_price is not None and max_price is not None:
-            products = products.filter(price__price__range=(min_price, max_price))
+        filters['variations'] = {key: request.GET.getlist(key) for key, _ in variation_category_choice
+                                 if request.GET.getlist(key)}
 
-        paginator = Paginator(products, 1)
-        page_number = request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
-        product_count = products.count()
+        result = (await facets.aget_index()).query(**filters)
+        paginator = BitsetPaginator(result.bits, Product.objects.select_related('category'), page_size(request))
+        page_obj = await paginator.aget_page(request)
 
-        return render(request, 'store/store.html', {'products': page_obj, 'product_count': product_count,
-                                                    'cats': cats, 'prices': prices})
+        category_facets = [(cat, result.categories.get(cat.id, 0)) for cat in cats]
+        variation_facets = sorted((key[0], key[1], count) for key, count in result.variations.items() if count)
+        return await render(request, 'store/store.html', {'products': page_obj, 'product_count': result.count,
+                                                    'cats': cats, 'prices': prices,
+                                                    'category_facets': category_facets,
+                                                    'variation_facets': variation_facets})
 
 
-class SingleProduct(APIView):
+@method_decorator([vary_on_cookie, condition(etag_func=product_etag)], name='get')
+class SingleProduct(View):
     """
-    APIView for displaying details of a single product.
+    Async view for displaying details of a single product, answering revisits with a 304 when the
+    product and the visitor's header did not change.
     """
 
-    def get(self, request, category_slug, product_slug):
+    async def get(self, request, category_slug, product_slug):
         """
         Handles GET requests for displaying details of a single product.
 
@@ -97,22 +122,26 @@ class SingleProduct(APIView):
             HttpResponse object with the rendered HTML template displaying product details.
         """
         try:
-            category = get_object_or_404(Category, slug=category_slug)
-            product = get_object_or_404(Product, category=category, slug=product_slug)
-            in_cart = CartItem.objects.filter(cart__cart_id=_cart_id(request), product=product).exists()
+            category = await get_object_or_404(Category, slug=category_slug)
+            # The variations are prefetched as the template cannot query from the event loop
+            product = await get_object_or_404(Product.objects.select_related('category').prefetch_related('variations'),
+                                              category=category, slug=product_slug)
+            cart_id = _cart_id(request)
+            in_cart = cart_id is not None and await CartItem.objects.filter(cart__cart_id=cart_id,
+                                                                            product=product).aexists()
         except Exception as e:
             raise e
 
-        return render(request, 'store/product-detail.html', {'category': category, 'product': product,
-                                                             'in_cart': in_cart})
+        return await render(request, 'store/product-detail.html', {'category': category, 'product': product,
+                                                                   'in_cart': in_cart})
 
 
-class Search(APIView):
+class Search(View):
     """
-    APIView for searching products based on a keyword.
+    Async view for searching products based on a keyword.
     """
 
-    def get(self, request):
+    async def get(self, request):
         """
         Handles GET requests for searching products based on a keyword.
 
@@ -122,16 +151,32 @@ class Search(APIView):
         Returns:
             HttpResponse object with the rendered HTML template displaying search results.
         """
-        keyword = request.GET.get("keyword")
-        if keyword:
-            products = Product.objects.filter(Q(product_name__icontains=keyword) | Q(artist__icontains=keyword) |
-                                              Q(variations__variation_value__icontains=keyword))
-            products = products.distinct().order_by('-id')
-            paginator = Paginator(products, 1)
-            page_number = request.GET.get("page")
-            page_obj = paginator.get_page(page_number)
-            product_count = products.count()
-
-            context = {'products': products,
-                   'product_Count': product_count}
-            return render(request, 'store/store.html', context)
+        keyword = request.GET.get("keyword", "")
+        products = search_products(Product.objects.select_related('category'), keyword)
+        paginator = KeysetPaginator(products, ('-rank', '-id'), page_size(request))
+        page_obj = await paginator.aget_page(request)
+        product_count = await acached_count(products)
+
+        context = {'products': page_obj,
+                   'product_count': product_count}
+        return await render(request, 'store/store.html', context)
+
+
+def autocomplete(request):
+    """
+    Function-based view returning search-box suggestions as JSON.
+
+    Suggestions come from the in-process prefix index, so no query is made per keystroke.
+
+    Args:
+        request: HttpRequest object representing the HTTP request.
+
+    Returns:
+        JsonResponse with up to ``limit`` (at most 10) product names and artists starting with ``keyword``.
+    """
+    try:
+        limit = min(int(request.GET.get("limit", 10)), 10)
+    except ValueError:
+        limit = 10
+    suggestions = get_index().suggest(request.GET.get("keyword", ""), limit)
+    return JsonResponse({'suggestions': suggestions})